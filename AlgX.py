@@ -1,5 +1,5 @@
 import Sudoku
-import math
+import math, sys
 global operations
 global covers
 global uncovers
@@ -13,11 +13,19 @@ class Root:
         self.left=None
         self.right=None
         self.name="root"
+        self.columns=[self] #columns[pos] is the header at position pos when fully uncovered
     def getColHead(self, pos):
+        if pos < len(self.columns):
+            return self.columns[pos]
         target=self
         for i in range(pos):
             target=target.right
         return target
+    def getActiveCol(self, pos): #like getColByName: the header at pos, or root if it is covered
+        col=self.columns[pos]
+        if col.left.right is col:
+            return col
+        return self
     def getColByName(self, name):
         target=self.right
         while(not target is self and target.name != name):
@@ -78,7 +86,7 @@ class ColumnHeader:
     
 class Node:
     def __init__(self, colHead: ColumnHeader, rowHead):
-        prevNode=colHead.lastNode()
+        prevNode=colHead.up #the header's up link always points at the last node
         self.left=None
         self.right=None
         self.up=prevNode
@@ -121,6 +129,7 @@ def genLinkList(puzzle: Sudoku.Sudoku):
                 prev.right=colH
                 colH.left=prev
                 colH.right=root
+                root.columns.append(colH)
                 if i==3 and j==puzzle.length and k==puzzle.length:
                     root.left=colH
                 prev=colH
@@ -157,41 +166,36 @@ def genLinkList(puzzle: Sudoku.Sudoku):
                     node4.right=node1
     return root
 
-def run(puzzle: Sudoku.Sudoku):
+def run(puzzle: Sudoku.Sudoku, control=None, stack=None) -> bool:
+    # control: optional solve_api.SolveControl, ticked once per search node
+    # stack: optional list used as the choice stack (row ids (row, col, digit) of the current
+    # partial solution). If the solve is interrupted it holds the choices so far; passing the
+    # same list back in resumes the search at that point.
     global operations
     #Initial board state generation
     root = genLinkList(puzzle)
+    if control is not None:
+        control.check()
     #print(root.right.right.size)
     initialBoard = puzzle.board
+    N = puzzle.length
+    N2 = N * N
     for row in range(puzzle.length):
         for col in range(puzzle.length):
             if initialBoard[row][col]!=0:
                 num = initialBoard[row][col]
-                colName="row {}, col {} contains a number".format(str(row+1), str(col+1))
-                #print(colName)
-                colHead=root.getColByName(colName)
-                #print(colHead.name)
-                if not colHead is root:
-                    colHead.cover()
-
-                colName = "row {} contains digit {}".format(str(row+1), str(num))
-                colHead=root.getColByName(colName)
-                if not colHead is root:
-                    colHead.cover()
-
-                colName = "col {} contains digit {}".format(str(col+1), str(num))
-                colHead=root.getColByName(colName)
-                if not colHead is root:
-                    colHead.cover()
-
                 box = (math.floor((row)/puzzle.size)*puzzle.size + math.ceil((col+1)/puzzle.size))
-                colName = "box {} contains digit {}".format(str(box), str(num))
-                colHead=root.getColByName(colName)
-                if not colHead is root:
-                    colHead.cover()
+                #same column positions as genLinkList: cell, row-digit, col-digit, box-digit
+                for colPos in (row*N + col + 1, row*N + num + N2, col*N + num + 2*N2, (box-1)*N + num + 3*N2):
+                    colHead=root.getActiveCol(colPos)
+                    if not colHead is root:
+                        colHead.cover()
 
-    solutionList= []
-    search(root, solutionList) #Run algorithm
+    solutionList = stack if stack is not None else []
+    resume = [tuple(rowId) for rowId in solutionList]
+    solutionList.clear()
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), N2 + 100)) #search recurses once per empty cell
+    search(root, solutionList, control, resume) #Run algorithm
     #print("done")
     #print(solutionList)
     #modify board state
@@ -201,19 +205,21 @@ def run(puzzle: Sudoku.Sudoku):
         col = val[1]
         digit = val [2]
         puzzle.board[row-1][col-1]=digit
-    if not puzzle.isComplete:
-        print("No solution found")
+    return puzzle.isComplete()
 
 
-def search(root: Root, solutionList: list):
+def search(root: Root, solutionList: list, control=None, resume=None):
+    # resume: choice stack to replay; each level starts at its recorded row instead of the first
     global operations
     #print("start")
+    if control is not None:
+        control.tick()
     if root.right is root:
         return
     
     #choose column
     minNode = None
-    minVal = 999
+    minVal = math.inf
     pointer = root.right
     while not pointer is root:
         operations+=2
@@ -224,7 +230,13 @@ def search(root: Root, solutionList: list):
     if minVal==0:
         return
     minNode.cover()
-    row = minNode.up
+    row = minNode.down
+    if resume:
+        while not row is minNode and row.rowHead.id != resume[0]:
+            row = row.down
+        if row is minNode:
+            raise ValueError(f"Choice {resume[0]} does not fit this puzzle")
+        resume = resume[1:]
     
     #choose row
     while not row is minNode:
@@ -237,7 +249,8 @@ def search(root: Root, solutionList: list):
             col = constraint.colHead
             col.cover()
             constraint=constraint.right
-        search(root, solutionList) #recursive call
+        search(root, solutionList, control, resume) #recursive call
+        resume = None
 
         #solution found
         if root.right is root:
@@ -261,7 +274,8 @@ if __name__ == "__main__":
     #digitString = "070000043040009610800634900094052000358460020000800530080070091902100005007040802"
     digitString ="090000000000000000000000000000000000100000000000000009000000000000000000009000000"
     board1.fillFromString(digitString)
-    run(board1)
+    if not run(board1):
+        print("No solution found")
     print(board1.toString())
     print("num operations: "+str(operations))
     print("num covers: "+str(covers))
@@ -33,47 +33,54 @@ def prevCell(puzzle: Sudoku, cell):
         cell[1]=puzzle.length-1
     return cell
 
-def algorithm(puzzle: Sudoku):
+def algorithm(puzzle: Sudoku, control=None):
     isStatic = puzzle.fixed
-    return run(puzzle, isStatic, [0, 0], False)
+    return run(puzzle, isStatic, [0, 0], False, control)
 
-def run(puzzle: Sudoku, isStatic, cell: list, inReverse: bool):
+def run(puzzle: Sudoku, isStatic, cell: list, inReverse: bool, control=None):
+    # Walks the cells forward/backward in a loop (each step used to be a tail call).
+    # control: optional solve_api.SolveControl, ticked once per step
     global operations
-    operations+=3
-    if cell[0] < 0:
-        return False
-    if cell[0] >= puzzle.length:
-        return True
-    
-    if isStatic[cell[0]][cell[1]]:
-        operations+=1
-        if inReverse:
-            return run(puzzle, isStatic, prevCell(puzzle, cell), True)
-        return run(puzzle, isStatic, nextCell(puzzle, cell), False)
-    
-    operations+=2
-    puzzle.board[cell[0]][cell[1]]+=1
-    while puzzle.board[cell[0]][cell[1]]<=puzzle.length:
-        if puzzle.isValid():
-            return run(puzzle, isStatic, nextCell(puzzle, cell), False)
-        operations+=1
+    while True:
+        if control is not None:
+            control.tick()
+        operations+=3
+        if cell[0] < 0:
+            return False
+        if cell[0] >= puzzle.length:
+            return True
+        
+        if isStatic[cell[0]][cell[1]]:
+            operations+=1
+            if inReverse:
+                cell = prevCell(puzzle, cell)
+            else:
+                cell = nextCell(puzzle, cell)
+            continue
+        
+        operations+=2
         puzzle.board[cell[0]][cell[1]]+=1
-    operations+=1    
-    puzzle.board[cell[0]][cell[1]]=0
-    return run(puzzle, isStatic, prevCell(puzzle, cell), True)
-
-
-board1 = Sudoku.Sudoku(3)
-digitString = "070000043040009610800634900094052000358460020000800530080070091902100005007040802"
-board1.fillFromString(digitString)
-algorithm(board1)
-print(board1.toString())
-print("num operations outside isValid: "+str(operations))
-print("number of isValid operations: "+str(board1.operations))
-print("number of times isValid ran: "+str(board1.isValidRuns))
-
-
-    
-
+        placed = False
+        while puzzle.board[cell[0]][cell[1]]<=puzzle.length:
+            if puzzle.isValid():
+                placed = True
+                break
+            operations+=1
+            puzzle.board[cell[0]][cell[1]]+=1
+        if placed:
+            cell, inReverse = nextCell(puzzle, cell), False
+            continue
+        operations+=1    
+        puzzle.board[cell[0]][cell[1]]=0
+        cell, inReverse = prevCell(puzzle, cell), True
 
 
+if __name__ == "__main__":
+    board1 = Sudoku.Sudoku(3)
+    digitString = "070000043040009610800634900094052000358460020000800530080070091902100005007040802"
+    board1.fillFromString(digitString)
+    algorithm(board1)
+    print(board1.toString())
+    print("num operations outside isValid: "+str(operations))
+    print("number of isValid operations: "+str(board1.operations))
+    print("number of times isValid ran: "+str(board1.isValidRuns))
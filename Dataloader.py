@@ -7,16 +7,23 @@ import csv, time
 from GraphBased.dSaturSolver import solve_sudoku_dsatur
 import AlgX
 
-def make_dataset(csv_path, limit = None):
-    pairs = []
+def iter_dataset(csv_path, limit = None, build_puzzles = True):
+    '''
+    Yields (puzzle, solution, puzzle_string) while reading. check_one rebuilds the Sudoku
+    from the string, so build_puzzles=False skips the first construction (puzzle is None).
+    '''
     with open(csv_path, newline = '') as f:     
         for i, row in enumerate(csv.DictReader(f)):
             if limit is not None and i >= limit: break
-            puzzle = Sudoku(3)
             puzzle_string = row['puzzle'].strip()
-            puzzle.fillFromString(puzzle_string)
-            pairs.append((puzzle, row['solution'].strip(), puzzle_string))
-    return pairs
+            puzzle = None
+            if build_puzzles:
+                puzzle = Sudoku(3)
+                puzzle.fillFromString(puzzle_string)
+            yield (puzzle, row['solution'].strip(), puzzle_string)
+
+def make_dataset(csv_path, limit = None):
+    return list(iter_dataset(csv_path, limit))
 
 def check_one(item, solver):
     _, solution, puzzle_string = item
@@ -35,10 +42,24 @@ def check_all(pairs, solver):
     correct = sum(correct for correct, _, _ in results)
     return results, total, correct
 
+def check_stream(items, solver):
+    '''Like check_all but consumes a lazy iterable and keeps only the totals.'''
+    n = total = correct = 0
+    for item in items:
+        ok, time_length, _ = check_one(item, solver)
+        n += 1
+        total += time_length
+        correct += ok
+    return n, total, correct
+
 '''
 DSatur Example:
 
 pairs = make_dataset("sudoku.csv", limit = 100)
 _, total, _ = check_all(pairs, lambda S: solve_sudoku_dsatur(S))
 print(f'Total Time: {total}')
+
+Streaming (constant memory):
+
+n, total, correct = check_stream(iter_dataset("sudoku.csv", build_puzzles=False), lambda S: solve_sudoku_dsatur(S))
 '''
\ No newline at end of file
@@ -1,55 +1,125 @@
-import csv, time, os
-from tqdm import tqdm
+import argparse, csv, json, queue, signal, threading, time, os, sys, tracemalloc
 from Sudoku import Sudoku
-from GraphBased.dSaturSolver import solve_sudoku_dsatur
-import SimAl
-import AlgX
+import board_codec
+import bench_results
+import solve_api
+from bench_results import ResultWriter, make_row
 
 FILES = {
     "size2.csv": 2,
     "size3.csv": 3,
     "size4.csv": 4,
     "size5.csv": 5,
+    "size6.csv": 6,
+    "size7.csv": 7,
 }
+DEFAULT_FILES = ["size2.csv", "size3.csv", "size4.csv", "size5.csv"]
 LIMIT = None
 
-def _char_to_val(ch: str) -> int:
-    ch = ch.strip()
-    if not ch or ch in {'0', '.'}:
-        return 0
-    if ch.isdigit():
-        return int(ch)
-    u = ch.upper()
-    if 'A' <= u <= 'Z':
-        return 10 + (ord(u) - ord('A'))
-    raise ValueError(f"Bad symbol '{ch}'")
+_char_to_val = board_codec.char_to_val
 
 def _load_into_sudoku(s: Sudoku, raw: str) -> None:
     N = s.length
-    if len(raw) != N * N:
-        raise ValueError(f"Expected {N*N} chars, got {len(raw)}")
+    values = board_codec.parse_values(raw, N)
     p = 0
     for i in range(N):
         for j in range(N):
-            v = _char_to_val(raw[p])
+            v = values[p]
             s.board[i][j] = v
             s.fixed[i][j] = (v != 0)
             p += 1
 
-def load_puzzles(csv_path: str, size: int, limit: int | None):
-    puzzles, bad = [], 0
+def parse_shard(spec: str) -> tuple[int, int]:
+    """'i/k' -> (i, k): this process takes rows whose index is i modulo k."""
+    i, k = (int(x) for x in spec.split("/"))
+    if k < 1 or not 0 <= i < k:
+        raise ValueError(f"Bad shard '{spec}', expected i/k with 0 <= i < k")
+    return i, k
+
+class LoadStats:
+    def __init__(self):
+        self.loaded = 0
+        self.bad = 0
+
+def iter_puzzles(csv_path: str, size: int, limit: int | None = None,
+                 shard: tuple[int, int] | None = None, stats: LoadStats | None = None):
+    """
+    Yields (row index, Sudoku) while reading the file. limit caps the rows read from the
+    file (before sharding), so every shard of the same run sees the same slice.
+    """
+    i, k = shard or (0, 1)
     with open(csv_path, newline='') as f:
         reader = csv.DictReader(f)
         for idx, row in enumerate(reader):
             if limit and idx >= limit:
                 break
+            if idx % k != i:
+                continue
             try:
                 s = Sudoku(size)
                 _load_into_sudoku(s, row["puzzle"].strip())
-                puzzles.append(s)
             except Exception:
-                bad += 1
-    return puzzles, bad
+                if stats is not None:
+                    stats.bad += 1
+                continue
+            if stats is not None:
+                stats.loaded += 1
+            yield idx, s
+
+def iter_batches(items, batch_size: int):
+    """Groups any iterable into lists of at most batch_size items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+_DONE = object()
+
+def prefetch(items, depth: int = 64):
+    """
+    Produces items on a background thread, at most `depth` ahead of the consumer, so
+    parsing overlaps solving while memory stays bounded.
+    """
+    if depth <= 0:
+        yield from items
+        return
+    q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    def produce():
+        try:
+            for item in items:
+                while not stop.is_set():
+                    try:
+                        q.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    return
+            q.put(_DONE)
+        except BaseException as e:
+            q.put(e)
+    t = threading.Thread(target=produce, daemon=True)
+    t.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+def load_puzzles(csv_path: str, size: int, limit: int | None, shard: tuple[int, int] | None = None):
+    stats = LoadStats()
+    puzzles = [s for _, s in iter_puzzles(csv_path, size, limit, shard, stats)]
+    return puzzles, stats.bad
 
 def _clone_sudoku(s: Sudoku) -> Sudoku:
     c = Sudoku(s.size)
@@ -57,91 +127,288 @@ def _clone_sudoku(s: Sudoku) -> Sudoku:
     c.fixed = [r[:] for r in s.fixed]
     return c
 
-def run_batch_two_solvers(puzzles, desc: str):
-    ds_total = ax_total = 0.0
-    ds_solved = ax_solved = 0
-    for S0 in tqdm(puzzles, desc=desc, unit="puzzle"):
-        S_ds = _clone_sudoku(S0)
-        t0 = time.perf_counter()
-        ok_ds, _ = solve_sudoku_dsatur(S_ds)
-        ds_total += time.perf_counter() - t0
-        if ok_ds and S_ds.isComplete():
-            ds_solved += 1
-        S_ax = _clone_sudoku(S0)
-        t1 = time.perf_counter()
-        AlgX.run(S_ax)
-        ax_total += time.perf_counter() - t1
-        if S_ax.isComplete():
-            ax_solved += 1
-    n = len(puzzles)
-    return ds_solved, ds_total, ax_solved, ax_total, n
-
-def run_batch_algx(puzzles, desc: str):
-    ax_total = 0.0
-    ax_solved = 0
-    for S0 in tqdm(puzzles, desc=desc, unit="puzzle"):
-        S_ax = _clone_sudoku(S0)
-        t1 = time.perf_counter()
-        AlgX.run(S_ax)
-        ax_total += time.perf_counter() - t1
-        if S_ax.isComplete():
-            ax_solved += 1
-    n = len(puzzles)
-    return ax_solved, ax_total, n
-
-def run_batch_simanneal(puzzles, desc: str):
-    sa_total = 0.0
-    sa_solved = 0
-    for S0 in tqdm(puzzles, desc=desc, unit="puzzle"):
-        S_sa = _clone_sudoku(S0)
-        t1 = time.perf_counter()
-
-        solver = SimAl.SimulatedAnnealing(S_sa)
-        solver.solve(display=False)
-
-        sa_total += time.perf_counter() - t1
-        if S_sa.isComplete():
-            sa_solved += 1
-    n = len(puzzles)
-    return sa_solved, sa_total, n
+def _clue_count(s: Sudoku) -> int:
+    return sum(sum(1 for f in row if f) for row in s.fixed)
 
+SOLVERS = list(solve_api.SOLVERS)
 
-if __name__ == "__main__":
-    g_ds_solved = g_ax_solved = g_ds_time = g_ax_time = g_count = 0
-    g_sa_solved = g_sa_time = 0
+def checkpoint_path(directory: str, name: str, fname: str, idx: int) -> str:
+    return os.path.join(directory, f"{name}-{os.path.basename(fname)}-{idx}.json")
+
+def _load_checkpoint(path: str) -> dict | None:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def _save_checkpoint(path: str, data: dict) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path) # never leave a half-written checkpoint behind
+
+def timed_solve(name: str, S0: Sudoku, trace_memory: bool = False, timeout: float | None = None,
+                token: solve_api.CancelToken | None = None, checkpoint: str | None = None,
+                checkpoint_interval: float = 60.0, **opts) -> tuple[bool, float, int | None, dict]:
+    """
+    Solves a clone of S0 with the named solver; opts go to the solver (e.g. seed).
+    Returns (solved, seconds, peak bytes, stats).
+    With a checkpoint path, resumable solvers save their in-flight state there periodically and
+    when cancelled, and continue from it next time; seconds then include the earlier attempts.
+    """
+    S = _clone_sudoku(S0)
+    saved = _load_checkpoint(checkpoint) if checkpoint else None
+    prior = saved["elapsed"] if saved else 0.0
+    save = None
+    if checkpoint:
+        start = time.monotonic()
+        save = lambda state: _save_checkpoint(checkpoint, {"elapsed": prior + time.monotonic() - start, "resume": state})
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        res = solve_api.solve(S, name, timeout=timeout, token=token, checkpoint=save,
+                              checkpoint_interval=checkpoint_interval, resume=saved["resume"] if saved else None,
+                              **opts)
+    finally:
+        peak = None
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    if checkpoint:
+        if res.status == solve_api.CANCELLED and res.resume is not None:
+            _save_checkpoint(checkpoint, {"elapsed": prior + res.elapsed, "resume": res.resume})
+        elif saved is not None or os.path.exists(checkpoint):
+            os.remove(checkpoint)
+    stats = dict(res.stats, status=res.status)
+    return res.solved, prior + res.elapsed, peak, stats
+
+def done_keys(results_path: str) -> set[tuple[str, str, int]]:
+    """(solver, file, index) of every solve already recorded in a results file."""
+    if not os.path.exists(results_path):
+        return set()
+    return {(row["solver"], row["file"], int(row["index"])) for row in bench_results.read_results(results_path)}
+
+# Randomised solvers that take a seed; with --profile-dir they get seed=index so a rerun repeats the solve
+SEEDED_SOLVERS = {"simanneal", "simanneal_jit"}
+
+# Solvers that take a whole batch of puzzles at once (batch_propagate.solve_many)
+BATCH_SOLVERS = {"lockstep"}
+
+def timed_solve_many(name: str, puzzles: list[Sudoku], timeout: float | None = None) -> list[tuple[bool, float, dict]]:
+    """Solves clones of a batch together. Returns (solved, seconds, stats) per puzzle."""
+    import batch_propagate
+    results = batch_propagate.solve_many([_clone_sudoku(s) for s in puzzles], timeout=timeout)
+    return [(res.solved, res.elapsed, dict(res.stats, status=res.status)) for res in results]
+
+def timed_solve_shared(name: str, puzzles: list[Sudoku], timeout: float | None, pool) -> list[tuple[bool, float, dict]]:
+    """Solves a batch on a shm_batch process pool. Returns (solved, seconds, stats) per puzzle."""
+    import shm_batch
+    results = shm_batch.solve_shared(puzzles, name, timeout=timeout, pool=pool, write_back=False)
+    return [(res.solved, res.elapsed, dict(res.stats, status=res.status)) for res in results]
+
+def run_batch(items, solvers, desc: str, fname: str = "", writer=None, trace_memory: bool = False,
+              timeout: float | None = None, batch_size: int = 256, done: set | None = None,
+              token: solve_api.CancelToken | None = None, checkpoint_dir: str | None = None,
+              checkpoint_interval: float = 60.0, pool=None, profiler=None):
+    """
+    Runs every solver on every (index, puzzle) item; items may be a lazy stream.
+    Batch solvers get batch_size puzzles at a time, the others one by one, or with a
+    shm_batch process pool, batch_size at a time spread over the pool (no checkpoints or
+    memory tracing then; puzzles go through shared memory, see shm_batch.py).
+    With a solve_profile.OutlierProfiler, solves slower than its percentile are re-run under
+    the profiler in this process and the row's stats name the profile files.
+    (solver, fname, index) keys in `done` are skipped. A cancelled token stops the run after
+    the current solve, which is not recorded (its checkpoint is, with checkpoint_dir).
+    Returns ({solver: (solved, total seconds)}, puzzle count).
+    """
+    from tqdm import tqdm # only the benchmark loop needs it; keeps `import Dataloader_II` light
+    totals = {name: [0, 0.0] for name in solvers}
+    batched = [name for name in solvers if name in BATCH_SOLVERS or pool is not None]
+    single = [name for name in solvers if name not in batched]
+    done = done or set()
+    n = 0
+
+    def opts(name, idx):
+        return {"seed": idx} if profiler is not None and name in SEEDED_SOLVERS else {}
 
+    def record(name, idx, S0, ok, elapsed, peak, stats):
+        if profiler is not None and profiler.is_outlier(name, S0.size, elapsed):
+            stats["profile"] = profiler.capture(name, S0, idx, **opts(name, idx))
+        totals[name][0] += ok
+        totals[name][1] += elapsed
+        if writer is not None:
+            writer.write(make_row(name, S0.size, fname, idx, _clue_count(S0), elapsed, ok, peak, stats))
 
-    for fname, size in FILES.items():
-        if not os.path.exists(fname):
+    with tqdm(desc=desc, unit="puzzle") as bar:
+        for batch in iter_batches(items, batch_size if batched else 1):
+            ran = set() # puzzles solved this run; resumed ones do not count towards n
+            for name in batched:
+                todo = [(idx, S0) for idx, S0 in batch if (name, fname, idx) not in done]
+                if todo:
+                    if name in BATCH_SOLVERS:
+                        results = timed_solve_many(name, [S0 for _, S0 in todo], timeout)
+                    else:
+                        results = timed_solve_shared(name, [S0 for _, S0 in todo], timeout, pool)
+                    for (idx, S0), (ok, elapsed, stats) in zip(todo, results):
+                        record(name, idx, S0, ok, elapsed, None, stats)
+                        ran.add(idx)
+            for idx, S0 in batch:
+                for name in single:
+                    if (name, fname, idx) in done:
+                        continue
+                    ran.add(idx)
+                    path = checkpoint_path(checkpoint_dir, name, fname, idx) if checkpoint_dir else None
+                    ok, elapsed, peak, stats = timed_solve(name, S0, trace_memory, timeout, token, path,
+                                                           checkpoint_interval, **opts(name, idx))
+                    if stats["status"] == solve_api.CANCELLED and token is not None and token.is_cancelled():
+                        return {name: tuple(t) for name, t in totals.items()}, n
+                    record(name, idx, S0, ok, elapsed, peak, stats)
+                n += idx in ran
+                bar.update(1)
+            if token is not None and token.is_cancelled():
+                break
+    return {name: tuple(t) for name, t in totals.items()}, n
+
+def run_batch_two_solvers(puzzles, desc: str, fname: str = "", writer=None):
+    res, _ = run_batch(enumerate(puzzles), ["dsatur", "algx"], desc, fname, writer)
+    (ds_solved, ds_total), (ax_solved, ax_total) = res["dsatur"], res["algx"]
+    return ds_solved, ds_total, ax_solved, ax_total, len(puzzles)
+
+def run_batch_algx(puzzles, desc: str, fname: str = "", writer=None):
+    ax_solved, ax_total = run_batch(enumerate(puzzles), ["algx"], desc, fname, writer)[0]["algx"]
+    return ax_solved, ax_total, len(puzzles)
+
+def run_batch_simanneal(puzzles, desc: str, fname: str = "", writer=None):
+    sa_solved, sa_total = run_batch(enumerate(puzzles), ["simanneal"], desc, fname, writer)[0]["simanneal"]
+    return sa_solved, sa_total, len(puzzles)
+
+LABELS = {"dsatur": "DSatur", "algx": "AlgX  ", "simanneal": "SimAnn", "backtracking": "Backtr", "lockstep": "Lockst",
+          "algx_jit": "AlgX-J", "simanneal_jit": "SimA-J"}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the solvers on the sizeN.csv files.")
+    parser.add_argument("--files", nargs="+", default=DEFAULT_FILES, help="puzzle files (default: size2..size5.csv)")
+    parser.add_argument("--solvers", default="dsatur,algx,simanneal",
+                        help="comma separated subset of: " + ", ".join(solve_api.SOLVERS))
+    parser.add_argument("--limit", type=int, default=LIMIT, help="max puzzles per file")
+    parser.add_argument("--shard", type=parse_shard, help="i/k: only solve rows with index %% k == i")
+    parser.add_argument("--prefetch", type=int, default=64, help="puzzles parsed ahead of the solver (0 = inline)")
+    parser.add_argument("--results", help="write one row per solve to this .jsonl or .csv file")
+    parser.add_argument("--timeout", type=float, help="per-solve deadline in seconds")
+    parser.add_argument("--batch-size", type=int, default=256,
+                        help="puzzles per call for batch solvers (lockstep) and per --workers dispatch")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="solve on this many processes, puzzles handed over in shared memory (0 = in process)")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip solves already recorded in --results (continue an interrupted sweep)")
+    parser.add_argument("--checkpoint-dir", help="save in-flight solver state here (algx, simanneal) and resume from it")
+    parser.add_argument("--checkpoint-interval", type=float, default=60.0, help="seconds between checkpoints")
+    parser.add_argument("--profile-dir",
+                        help="re-run solves slower than --profile-percentile under cProfile and a stack "
+                             "sampler; writes {solver}-size{n}-{index}.prof and .collapsed here")
+    parser.add_argument("--profile-percentile", type=float, default=99.0,
+                        help="percentile of the solver's times so far (per size) that counts as slow")
+    parser.add_argument("--profile-min-solves", type=int, default=50,
+                        help="solves per solver and size before anything counts as slow")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="record peak allocation per solve with tracemalloc (slows solving)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two result files instead of running (see bench_results.py)")
+    args, rest = parser.parse_known_args(argv)
+    if rest and not args.compare: # the leftovers are only for bench_results
+        parser.error("unrecognized arguments: " + " ".join(rest))
+    return args, rest
+
+
+def main(argv=None) -> int:
+    args, rest = parse_args(argv)
+    if args.compare:
+        return bench_results.main(args.compare + rest)
+
+    solvers = [s.strip() for s in args.solvers.split(",") if s.strip()]
+    for name in solvers:
+        if name not in solve_api.SOLVERS:
+            print(f"Unknown solver '{name}'", file=sys.stderr)
+            return 2
+    if args.resume and not args.results:
+        print("--resume needs --results", file=sys.stderr)
+        return 2
+    done = done_keys(args.results) if args.resume else set()
+    if done:
+        print(f"Resuming: {len(done)} solves already in {args.results}")
+    if args.workers and (args.checkpoint_dir or args.trace_memory):
+        print("--workers does not support --checkpoint-dir or --trace-memory", file=sys.stderr)
+        return 2
+    if args.checkpoint_dir:
+        os.makedirs(args.checkpoint_dir, exist_ok=True)
+    profiler = None
+    if args.profile_dir:
+        import solve_profile
+        os.makedirs(args.profile_dir, exist_ok=True)
+        profiler = solve_profile.OutlierProfiler(args.profile_dir, args.profile_percentile,
+                                                 args.profile_min_solves, args.timeout)
+    writer = ResultWriter(args.results) if args.results else None
+
+    # SIGTERM (preemption) or Ctrl-C: stop after checkpointing the current solve; a second one kills
+    token = solve_api.CancelToken()
+    def stop(signum, frame):
+        token.cancel()
+        signal.signal(signum, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    pool = None
+    if args.workers:
+        import shm_batch
+        pool = shm_batch.make_pool(args.workers)
+
+    g_count = 0
+    g_totals = {name: [0, 0.0] for name in solvers}
+
+    for fname in args.files:
+        size = FILES.get(os.path.basename(fname))
+        if not os.path.exists(fname) or size is None:
             print(f"Skipping {fname} (not found)")
             continue
-        puzzles, bad = load_puzzles(fname, size, LIMIT)
-        print(f"{fname}: loaded {len(puzzles)} puzzles (skipped {bad})")
+        load_stats = LoadStats()
+        items = prefetch(iter_puzzles(fname, size, args.limit, args.shard, load_stats), args.prefetch)
 
         desc = f"Solving {fname} (n={size})"
-        #ax_solved, ax_total, n = run_batch_algx(puzzles, desc)
-        ds_solved, ds_total, ax_solved, ax_total, n = run_batch_two_solvers(puzzles, desc)
-        sa_solved, sa_total, _ = run_batch_simanneal(puzzles, desc + " [SA]")
-
-        
-        g_ds_solved += ds_solved
-        g_ax_solved += ax_solved
-        g_ds_time += ds_total
-        g_ax_time += ax_total
-        g_sa_solved += sa_solved
-        g_sa_time += sa_total
-
+        res, n = run_batch(items, solvers, desc, fname, writer, args.trace_memory, args.timeout, args.batch_size,
+                           done, token, args.checkpoint_dir, args.checkpoint_interval, pool, profiler)
+        print(f"{fname}: streamed {load_stats.loaded} puzzles (skipped {load_stats.bad})")
         g_count += n
 
         N = size * size
         print(f"(n={size}, {N}x{N})")
-        print(f"  DSatur: {ds_solved}/{n} | {ds_total:.3f}s | {ds_total/n:.4f}s avg")
-        print(f"  AlgX  : {ax_solved}/{n} | {ax_total:.3f}s | {ax_total/n:.4f}s avg\n")
-        print(f"  SimAnn: {sa_solved}/{n} | {sa_total:.3f}s | {sa_total/n:.4f}s avg\n")
+        for name in solvers:
+            solved, total = res[name]
+            g_totals[name][0] += solved
+            g_totals[name][1] += total
+            if n:
+                print(f"  {LABELS.get(name, name)}: {solved}/{n} | {total:.3f}s | {total/n:.4f}s avg")
+        print()
+
+        if token.is_cancelled():
+            break
 
+    if writer is not None:
+        writer.close()
+    if pool is not None:
+        pool.shutdown()
+    if profiler is not None and profiler.captured:
+        print(f"Profiled {profiler.captured} slow solves into {args.profile_dir}")
+    if token.is_cancelled():
+        print("Interrupted; rerun with --resume to continue", file=sys.stderr)
+        return 1
 
     if g_count:
         print("Overall:")
-        print(f"  DSatur: {g_ds_solved}/{g_count} | {g_ds_time:.3f}s | {g_ds_time/g_count:.4f}s avg")
-        print(f"  AlgX  : {g_ax_solved}/{g_count} | {g_ax_time:.3f}s | {g_ax_time/g_count:.4f}s avg")
-        print(f"  SimAnn: {g_sa_solved}/{g_count} | {g_sa_time:.3f}s | {g_sa_time/g_count:.4f}s avg")
+        for name in solvers:
+            solved, total = g_totals[name]
+            print(f"  {LABELS.get(name, name)}: {solved}/{g_count} | {total:.3f}s | {total/g_count:.4f}s avg")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
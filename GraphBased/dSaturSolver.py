@@ -1,7 +1,21 @@
+import sys
 from Sudoku import Sudoku  
 from GraphBased.SudokuGraph import are_neighbors
 
-def solve_sudoku_dsatur(s: Sudoku) -> tuple[bool, int]:
+def select_vertex(colors: dict[int, int], V: int, N: int, n: int) -> int | None:
+    # Uncolored vertex with the most distinct neighbor colors (ties -> lowest index)
+    best_v, best_key = None, (-1, -1)
+    for v in range(V):
+        if v in colors: 
+            continue
+        sat = len({colors[j] for j in colors if are_neighbors(v, j, N, n)})
+        key = (sat, -v)
+        if key > best_key:
+            best_key, best_v = key, v
+    return best_v
+
+def solve_sudoku_dsatur(s: Sudoku, control=None, max_steps: int | None = 1000) -> tuple[bool, int]:
+    # control: optional solve_api.SolveControl, ticked once per step; max_steps=None searches exhaustively
     n, N = s.size, s.length
     V = N * N
     steps = 0
@@ -9,30 +23,21 @@ def solve_sudoku_dsatur(s: Sudoku) -> tuple[bool, int]:
     # Current assignments
     colors: dict[int, int] = {r * N + c: s.board[r][c] for r in range(N) for c in range(N) if s.fixed[r][c]}
 
-    def select_vertex() -> int | None:
-        best_v, best_key = None, (-1, -1)
-        for v in range(V):
-            if v in colors: 
-                continue
-            sat = len({colors[j] for j in colors if are_neighbors(v, j, N, n)})
-            key = (sat, -v)
-            if key > best_key:
-                best_key, best_v = key, v
-        return best_v
-
     def domain(v: int) -> list[int]:
         used = {colors[j] for j in colors if are_neighbors(v, j, N, n)}
         return [d for d in range(1, N + 1) if d not in used]
 
     def search() -> bool:
         nonlocal steps
-        if steps >= 1000: 
+        if max_steps is not None and steps >= max_steps: 
             return False
-        v = select_vertex()
+        v = select_vertex(colors, V, N, n)
         if v is None:
             return True # All cells have an assignment
         for d in domain(v):
             steps += 1 # Every cell check is a step
+            if control is not None:
+                control.tick()
             if any(colors.get(j) == d and are_neighbors(v, j, N, n) for j in colors):
                 continue # Is our assignment consistent?
             colors[v] = d
@@ -41,6 +46,7 @@ def solve_sudoku_dsatur(s: Sudoku) -> tuple[bool, int]:
             del colors[v] # backtrack
         return False
 
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), V + 100)) # one frame per colored vertex
     ok = search()
     if not ok:
         return False, steps
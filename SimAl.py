@@ -1,30 +1,25 @@
 import numpy as np
-import math, random
+import argparse, csv, math, random, sys
 from itertools import permutations
-
-all_digits = {
-    2: list(range(1, 5)),
-    3: list(range(1, 10)),
-    4: list(range(1, 17)),
-    5: list(range(1, 26))
-}
+import board_codec
 
 def _to_int(val):
     if isinstance(val, (int, np.integer)):
         return int(val)
     if isinstance(val, str):
-        val = val.strip().upper()
-        if not val or val in {'0', '.'}:
-            return 0
-        if val.isdigit():
-            return int(val)
-        if 'A' <= val <= 'Z':
-            return 10 + (ord(val) - ord('A'))
+        return board_codec.token_to_val(val)
     raise ValueError(f"Bad symbol '{val}'")
 
+STATE_VERSION = 1
+
 class SimulatedAnnealing:
-    def __init__(self, sudoku_init, t_init=5.0, decay=0.99995, max_plateau=35000, max_reheats=2000):
+    MIN_T = 0.01
+
+    def __init__(self, sudoku_init, t_init=5.0, decay=0.99995, max_plateau=35000, max_reheats=2000, seed=None,
+                 legal_moves=True, free_swap_prob=0.02):
         self.sudoku = sudoku_init
+        # own RNG so a checkpoint can capture it; unseeded runs still follow random.seed()
+        self.rng = random.Random(seed if seed is not None else random.getrandbits(64))
         self.grid = np.array(sudoku_init.board)
         self.grid = np.vectorize(_to_int)(self.grid)
         self.fixed = np.array(sudoku_init.fixed)
@@ -48,10 +43,32 @@ class SimulatedAnnealing:
         self.best_error = float('inf')
         self.tried_BF = False
 
+        # Values each free cell may take without clashing with a fixed clue in its row or column.
+        # With legal_moves, the initial fill and most swaps keep free cells within these sets. Legal
+        # pairwise swaps alone do not connect all legal box fillings (some need a 3-cycle), so a
+        # free_swap_prob share of proposals, the reheat swaps and the brute force stay unrestricted.
+        self.legal_moves = legal_moves
+        self.free_swap_prob = free_swap_prob
+        self.legal = self.compute_legal_values()
+        self.box_free = [[(r, c) for r in range(br*self.n, (br+1)*self.n)
+                          for c in range(bc*self.n, (bc+1)*self.n) if not self.fixed[r, c]]
+                         for br in range(self.n) for bc in range(self.n)]
+
         # Initial population
         self.populate_strict_boxes()
         self.error_count = self.compute_total_errors()
 
+    def compute_legal_values(self):
+        """legal[r][c]: set of values not held by a fixed clue in row r or column c (free cells only)."""
+        clue_rows = [set() for _ in range(self.length)]
+        clue_cols = [set() for _ in range(self.length)]
+        for r, c in zip(*np.nonzero(self.fixed)):
+            clue_rows[r].add(int(self.grid[r, c]))
+            clue_cols[c].add(int(self.grid[r, c]))
+        everything = set(range(1, self.length + 1))
+        return [[everything - clue_rows[r] - clue_cols[c] if not self.fixed[r, c] else set()
+                 for c in range(self.length)] for r in range(self.length)]
+
     def populate_strict_boxes(self):
         """Fill each n x n box with all numbers 1..N exactly once."""
         for br in range(self.n):
@@ -61,14 +78,38 @@ class SimulatedAnnealing:
                     for c in range(bc*self.n, (bc+1)*self.n):
                         if self.fixed[r, c] and self.grid[r, c] in numbers:
                             numbers.remove(self.grid[r, c])
-                positions = [(r, c) for r in range(br*self.n, (br+1)*self.n)
-                             for c in range(bc*self.n, (bc+1)*self.n)
-                             if not self.fixed[r, c]]
-                random.shuffle(positions)
-                random.shuffle(numbers)
+                positions = list(self.box_free[br*self.n + bc])
+                self.rng.shuffle(positions)
+                self.rng.shuffle(numbers)
+                if self.legal_moves:
+                    positions, numbers = self.match_legal(positions, numbers)
                 for (r, c), val in zip(positions, numbers):
                     self.grid[r, c] = val
 
+    def match_legal(self, positions, numbers):
+        """
+        Pairs box cells with the box's missing numbers so that as many cells as possible get a
+        legal value (maximum bipartite matching, augmenting paths). Cells left unmatched get the
+        leftover numbers. Returns the reordered (positions, numbers).
+        """
+        owner = {} # number -> position it is matched to
+
+        def augment(pos, seen):
+            for v in numbers:
+                if v in self.legal[pos[0]][pos[1]] and v not in seen:
+                    seen.add(v)
+                    if v not in owner or augment(owner[v], seen):
+                        owner[v] = pos
+                        return True
+            return False
+
+        for pos in positions:
+            augment(pos, set())
+        placed = {pos: v for v, pos in owner.items()}
+        rest_pos = [pos for pos in positions if pos not in placed]
+        rest_num = [v for v in numbers if v not in owner]
+        return list(placed) + rest_pos, list(placed.values()) + rest_num
+
     def compute_total_errors(self):
         """Count total number of conflicting cells in rows and columns."""
         errors = 0
@@ -122,18 +163,26 @@ class SimulatedAnnealing:
 
     def swap(self):
         """Swap two non-fixed cells within the same box."""
-        br, bc = random.randint(0, self.n-1), random.randint(0, self.n-1)
-        candidates = [(r, c) for r in range(br*self.n, (br+1)*self.n)
-                              for c in range(bc*self.n, (bc+1)*self.n)
-                              if not self.fixed[r, c]]
+        br, bc = self.rng.randint(0, self.n-1), self.rng.randint(0, self.n-1)
+        candidates = self.box_free[br*self.n + bc]
         if len(candidates) < 2:
             return False
-        (r1, c1), (r2, c2) = random.sample(candidates, 2)
+        if self.legal_moves and self.rng.random() >= self.free_swap_prob:
+            # only exchanges that keep both values legal against the clues
+            r1, c1 = self.rng.choice(candidates)
+            v1, legal1 = self.grid[r1, c1], self.legal[r1][c1]
+            partners = [(r, c) for r, c in candidates
+                        if self.grid[r, c] in legal1 and v1 in self.legal[r][c] and (r, c) != (r1, c1)]
+            if not partners:
+                return False
+            r2, c2 = self.rng.choice(partners)
+        else:
+            (r1, c1), (r2, c2) = self.rng.sample(candidates, 2)
 
         delta = self.compute_delta_errors(r1, c1, r2, c2)
         accepted = False
 
-        if delta < 0 or random.random() < math.exp(-delta / max(self.T, 1e-9)):
+        if delta < 0 or self.rng.random() < math.exp(-delta / max(self.T, 1e-9)):
             self.grid[r1, c1], self.grid[r2, c2] = self.grid[r2, c2], self.grid[r1, c1]
             self.error_count += delta
             accepted = True
@@ -154,7 +203,7 @@ class SimulatedAnnealing:
         return [cell for cell in conflicts if not self.fixed[cell]]
 
     def focused_swaps(self, conflict_cells):
-        random.shuffle(conflict_cells)
+        self.rng.shuffle(conflict_cells)
         for i in range(0, len(conflict_cells), 2):
             if i+1 < len(conflict_cells):
                 r1, c1 = conflict_cells[i]
@@ -188,10 +237,74 @@ class SimulatedAnnealing:
 
         return False
 
-    def solve(self, display=False, max_iters=8*(10**6)):
-        min_T = 0.01
+    def state_dict(self) -> dict:
+        """JSON-serializable in-flight state: grid, temperature, counters and RNG state."""
+        version, internal, gauss = self.rng.getstate()
+        return {
+            "version": STATE_VERSION,
+            "grid": self.grid.tolist(),
+            "T": self.T,
+            "iters": self.iters,
+            "iters_since_improvement": self.iters_since_improvement,
+            "reheats": self.reheats,
+            "best_error": None if math.isinf(self.best_error) else int(self.best_error),
+            "error_count": int(self.error_count),
+            "tried_BF": self.tried_BF,
+            "rng": [version, list(internal), gauss],
+        }
+
+    def load_state_dict(self, state: dict) -> None:
+        """Continues from a state_dict() taken on the same puzzle."""
+        if state.get("version") != STATE_VERSION:
+            raise ValueError(f"Unsupported annealer state version {state.get('version')}")
+        grid = np.array(state["grid"])
+        if grid.shape != self.grid.shape or (grid[self.fixed] != self.grid[self.fixed]).any():
+            raise ValueError("Annealer state does not match this puzzle")
+        self.grid = grid
+        self.T = state["T"]
+        self.iters = state["iters"]
+        self.iters_since_improvement = state["iters_since_improvement"]
+        self.reheats = state["reheats"]
+        self.best_error = float('inf') if state["best_error"] is None else state["best_error"]
+        self.error_count = state["error_count"]
+        self.tried_BF = state["tried_BF"]
+        version, internal, gauss = state["rng"]
+        self.rng.setstate((version, tuple(internal), gauss))
+
+    def step_events(self, display=False):
+        """Brute force / reheat checks that follow each swap. Returns True when brute force solved the board."""
+        # Apply local brute force if very few conflicts
+        if self.error_count <= 4 and self.n>3 and not self.tried_BF:
+            improved = self.simple_brute_force()
+            self.tried_BF = True
+            if improved and self.error_count == 0:
+                
+                #print("[Simple brute force] Solution found!")
+                return True
+
+        # Plateau: reheat + focused perturbation
+        if self.iters_since_improvement >= self.N_plateau and self.reheats < self.max_reheats:
+            self.T = max(0.6, self.T * 1.5)
+            self.reheats += 1
+            if display:
+                print(f"[Reheat {self.reheats}] Temp reset to {self.T:.4f}, Errors={self.error_count}")
+
+            conflict_cells = self.get_conflict_cells()
+            if conflict_cells:
+                self.focused_swaps(conflict_cells)
+                self.error_count = self.compute_total_errors()
+                if display:
+                    print(f"[Perturb] Focused swaps on {len(conflict_cells)} conflict cells. Errors={self.error_count}")
 
+            self.iters_since_improvement = 0
+            self.tried_BF = False
+        return False
+
+    def solve(self, display=False, max_iters=8*(10**6), control=None):
+        """control: optional solve_api.SolveControl, ticked once per iteration."""
         while self.error_count > 0 and self.iters < max_iters:
+            if control is not None:
+                control.tick()
             self.swap()
 
             # Update best error / plateau counter
@@ -201,34 +314,11 @@ class SimulatedAnnealing:
             else:
                 self.iters_since_improvement += 1
 
-            # Apply local brute force if very few conflicts
-            if self.error_count <= 4 and self.n>3 and not self.tried_BF:
-                improved = self.simple_brute_force()
-                self.tried_BF = True
-                if improved and self.error_count == 0:
-                    
-                    #print("[Simple brute force] Solution found!")
-                    break
-
-            # Plateau: reheat + focused perturbation
-            if self.iters_since_improvement >= self.N_plateau and self.reheats < self.max_reheats:
-                self.T = max(0.6, self.T * 1.5)
-                self.reheats += 1
-                if display:
-                    print(f"[Reheat {self.reheats}] Temp reset to {self.T:.4f}, Errors={self.error_count}")
-
-                conflict_cells = self.get_conflict_cells()
-                if conflict_cells:
-                    self.focused_swaps(conflict_cells)
-                    self.error_count = self.compute_total_errors()
-                    if display:
-                        print(f"[Perturb] Focused swaps on {len(conflict_cells)} conflict cells. Errors={self.error_count}")
-
-                self.iters_since_improvement = 0
-                self.tried_BF = False
+            if self.step_events(display):
+                break
 
             # Decay temperature
-            self.T = max(self.T * self.decay, min_T)
+            self.T = max(self.T * self.decay, self.MIN_T)
             self.iters += 1
 
             if display and self.iters % 5000 == 0:
@@ -238,3 +328,32 @@ class SimulatedAnnealing:
         if display:
             print(f"Solved in {self.iters} iterations, {self.reheats} reheats.")
         return self.iters
+
+def main(argv=None) -> int:
+    # seeded convergence check: every seed has to solve the puzzle within max_iters
+    import solve_api
+    from Sudoku import Sudoku
+    parser = argparse.ArgumentParser(description="Check that the annealer converges on a puzzle for every seed.")
+    parser.add_argument("--file", default="size3.csv")
+    parser.add_argument("--index", type=int, default=0, help="row of --file (default 0, which once trapped legal-only swaps)")
+    parser.add_argument("--seeds", type=int, default=8)
+    parser.add_argument("--solvers", default="simanneal,simanneal_jit")
+    parser.add_argument("--max-iters", type=int, default=400000)
+    args = parser.parse_args(argv)
+
+    with open(args.file, newline='') as f:
+        text = [row["puzzle"].strip() for row in csv.DictReader(f)][args.index]
+    size = board_codec.infer_size(text)
+    failed = 0
+    for solver in args.solvers.split(","):
+        for seed in range(args.seeds):
+            s = Sudoku(size)
+            s.fillFromString(text)
+            res = solve_api.solve(s, solver, seed=seed, max_iters=args.max_iters)
+            print(f"{solver} seed {seed}: {res.status} after {res.stats['iters']} iters, {res.stats['errors']} errors")
+            failed += not res.solved
+    print("OK" if not failed else f"{failed} runs did not converge")
+    return 0 if not failed else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
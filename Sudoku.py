@@ -1,3 +1,6 @@
+import array
+import board_codec
+
 class Sudoku:
     def __init__(self, size):
         self.size = size #size 3 means 9x9
@@ -7,8 +10,8 @@ class Sudoku:
         self.operations = 0
         self.isValidRuns = 0
     
-    def fillFromString(self, digitString): #only works with size 3 or less. done with digits. zero is empty
-        digitArr = [int(char) for char in digitString] 
+    def fillFromString(self, digitString): #character form (1-9, A-Z) or space/comma separated tokens for any size. zero is empty
+        digitArr = board_codec.parse_values(digitString, self.length)
         pointer = 0
         for i in range(self.length):
             for j in range(self.length):
@@ -17,6 +20,17 @@ class Sudoku:
                     self.fixed[i][j]=True
                 pointer += 1
 
+    def fillFromValues(self, values, offset=0): #flat row-major values (list, array or memoryview) starting at offset. zero is empty
+        for i in range(self.length):
+            row = values[offset+i*self.length : offset+(i+1)*self.length]
+            self.board[i] = row.tolist() if isinstance(row, memoryview) else list(row) #whole rows keep the copying in C
+            self.fixed[i] = list(map(bool, self.board[i]))
+
+    def writeValues(self, out, offset=0): #writes the board row-major into a flat list, array or memoryview starting at offset
+        typecode = getattr(out, "format", None) or getattr(out, "typecode", None) #memoryview / array.array
+        for i, row in enumerate(self.board):
+            out[offset+i*self.length : offset+(i+1)*self.length] = array.array(typecode, row) if typecode else row
+
     def toString(self):
         output = ""
         for row in self.board:
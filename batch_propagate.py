@@ -0,0 +1,205 @@
+'''
+Lockstep constraint propagation over a batch of puzzles.
+
+B puzzles of the same size are held as one (B, N, N, N) boolean candidate tensor,
+cand[b, r, c, v-1] = "value v is still possible at (r, c) in puzzle b". Each round
+applies, to every puzzle at once with NumPy reductions over the row, column and box
+axes:
+
+  naked singles:  a cell with one candidate removes it from its row, column and box
+  hidden singles: a value with one place left in a row, column or box goes there
+
+until nothing changes. Puzzles that end with every cell decided are solved; those with
+an empty cell or a unit missing a value are unsat.
+
+Puzzles that singles alone cannot finish (most 20-clue 9x9s) are split in lockstep too:
+every open puzzle picks its cell with the fewest candidates, continues with "cell = first
+candidate" and pushes "cell != first candidate" on its own stack, and the current
+branches of all puzzles are propagated together again; a dead end resumes from the top
+of its stack. This is a depth-first search per puzzle, stepping in lockstep. Puzzles
+still open after max_nodes steps are handed one by one to a fallback solver (AlgX by
+default) with the propagated cells filled in.
+
+    results = solve_many(puzzles)               # list of solve_api.SolveResult
+'''
+
+import time
+import numpy as np
+from Sudoku import Sudoku
+import solve_api
+
+OPEN, SOLVED, CONTRADICTION = 0, 1, -1
+
+def encode(values: np.ndarray, size: int) -> np.ndarray:
+    '''(B, N, N) cell values (0 = empty) -> (B, N, N, N) candidate tensor, clues one-hot.'''
+    N = size * size
+    values = np.asarray(values).reshape(-1, N, N)
+    cand = np.ones(values.shape + (N,), dtype=bool)
+    given = values > 0
+    cand[given] = np.eye(N, dtype=bool)[values[given] - 1]
+    return cand
+
+def decode(cand: np.ndarray) -> np.ndarray:
+    '''Candidate tensor -> (B, N, N) values, 0 where the cell is not decided.'''
+    decided = cand.sum(axis=-1) == 1
+    return np.where(decided, cand.argmax(axis=-1) + 1, 0)
+
+def _box_view(a: np.ndarray, n: int) -> np.ndarray:
+    # (B, N, N, N) -> (B, box row, row in box, box col, col in box, value)
+    B, N = a.shape[0], a.shape[1]
+    return a.reshape(B, n, n, n, n, N)
+
+def _round(cand: np.ndarray, n: int) -> tuple[np.ndarray, np.ndarray]:
+    '''One naked + hidden singles pass. Returns (new cand, per-puzzle contradiction flags).'''
+    B, N = cand.shape[0], cand.shape[1]
+    cnt = np.uint8 if N < 256 else np.uint16 # unit counts fit; summing bools into int64 is the main cost
+
+    # naked singles: eliminate placed values from the rest of their units
+    singles = cand & (cand.sum(axis=-1, dtype=cnt) == 1)[..., None]
+    row_placed = singles.sum(axis=2, dtype=cnt)                    # (B, r, v)
+    col_placed = singles.sum(axis=1, dtype=cnt)                    # (B, c, v)
+    box_placed = _box_view(singles, n).sum(axis=(2, 4), dtype=cnt)  # (B, br, bc, v)
+    bad = ((row_placed > 1).any(axis=(1, 2)) | (col_placed > 1).any(axis=(1, 2))
+           | (box_placed > 1).any(axis=(1, 2, 3)))
+    taken = (row_placed > 0)[:, :, None, :] | (col_placed > 0)[:, None, :, :]
+    taken |= np.broadcast_to((box_placed > 0)[:, :, None, :, None, :], (B, n, n, n, n, N)).reshape(B, N, N, N)
+    cand = (cand & ~taken) | singles
+
+    # hidden singles: a value with exactly one place in a unit is forced there
+    row_cnt = cand.sum(axis=2, dtype=cnt)
+    col_cnt = cand.sum(axis=1, dtype=cnt)
+    box_cnt = _box_view(cand, n).sum(axis=(2, 4), dtype=cnt)
+    forced = cand & ((row_cnt == 1)[:, :, None, :] | (col_cnt == 1)[:, None, :, :])
+    forced |= (_box_view(cand, n) & (box_cnt == 1)[:, :, None, :, None, :]).reshape(B, N, N, N)
+    forced_n = forced.sum(axis=-1, dtype=cnt)
+    bad |= (forced_n > 1).any(axis=(1, 2))
+    cand = np.where((forced_n == 1)[..., None], forced, cand)
+
+    bad |= ~cand.any(axis=-1).all(axis=(1, 2))
+    bad |= (row_cnt == 0).any(axis=(1, 2)) | (col_cnt == 0).any(axis=(1, 2)) | (box_cnt == 0).any(axis=(1, 2, 3))
+    return cand, bad
+
+def propagate(cand: np.ndarray, size: int, max_rounds: int | None = None) -> tuple[np.ndarray, np.ndarray, int]:
+    '''
+    Runs singles rounds until no puzzle changes. Only puzzles still changing take part in
+    later rounds. Returns (cand, status per puzzle: OPEN/SOLVED/CONTRADICTION, rounds).
+    '''
+    B = cand.shape[0]
+    status = np.full(B, OPEN, dtype=np.int8)
+    active = np.arange(B)
+    counts = cand.reshape(B, -1).sum(axis=1, dtype=np.int32)
+    rounds = 0
+    while active.size and (max_rounds is None or rounds < max_rounds):
+        rounds += 1
+        sub, bad = _round(cand[active], size)
+        cand[active] = sub
+        new_counts = sub.reshape(len(active), -1).sum(axis=1, dtype=np.int32)
+        status[active[bad]] = CONTRADICTION
+        changed = (new_counts != counts[active]) & ~bad
+        counts[active] = new_counts
+        active = active[changed]
+    N = size * size
+    done = (status == OPEN) & (counts == N * N)
+    status[done] = SOLVED
+    return cand, status, rounds
+
+def branch(cand: np.ndarray, size: int, max_nodes: int = 256) -> tuple[np.ndarray, np.ndarray, int]:
+    '''
+    Propagates, then runs a depth-first search per open puzzle, all puzzles stepping in
+    lockstep, until each is solved, proven unsat or has taken max_nodes steps. Returns
+    (cand, status, rounds); puzzles still OPEN keep their root propagation result in cand.
+    '''
+    N = size * size
+    cand, status, rounds = propagate(cand, size)
+    owner = np.flatnonzero(status == OPEN)
+    front = cand[owner].copy()
+    stacks = {int(b): [] for b in owner}
+    for _ in range(max_nodes):
+        if not owner.size:
+            break
+        # split every open branch on its fewest-candidates cell: push "cell != v", go on with "cell = v"
+        M = len(owner)
+        cnt = front.sum(axis=-1).reshape(M, -1)
+        r, c = np.divmod(np.where(cnt > 1, cnt, N + 1).argmin(axis=1), N)
+        m = np.arange(M)
+        v = front[m, r, c].argmax(axis=1)
+        alt = front.copy()
+        alt[m, r, c, v] = False
+        for j, b in enumerate(owner):
+            stacks[int(b)].append(alt[j])
+        front[m, r, c] = False
+        front[m, r, c, v] = True
+        retry = m
+        # propagate; dead ends resume from their latest pending alternative until one survives
+        while retry.size:
+            sub, st, k = propagate(front[retry], size)
+            rounds += k
+            front[retry] = sub
+            for j in retry[st == SOLVED]:
+                cand[owner[j]] = front[j]
+                status[owner[j]] = SOLVED
+            again = []
+            for j in retry[st == CONTRADICTION]:
+                stack = stacks[int(owner[j])]
+                if stack:
+                    front[j] = stack.pop()
+                    again.append(j)
+                else:
+                    status[owner[j]] = CONTRADICTION
+            retry = np.array(again, dtype=int)
+        keep = status[owner] == OPEN
+        front, owner = front[keep], owner[keep]
+    return cand, status, rounds
+
+def _board_values(puzzles: list[Sudoku]) -> np.ndarray:
+    return np.array([s.board for s in puzzles], dtype=np.int32)
+
+def solve_many(puzzles: list[Sudoku], fallback: str | None = "algx", timeout: float | None = None,
+               chunk: int = 1024, max_nodes: int = 256) -> list[solve_api.SolveResult]:
+    '''
+    Solves puzzles (all the same size) in place. The batch time of a chunk is split evenly
+    over its puzzles; fallback solves add their own time. timeout applies to each fallback
+    solve. stats["propagated"] tells whether the batch engine finished the puzzle itself.
+    max_nodes=0 turns the lockstep search off (singles only).
+    '''
+    results = []
+    for start in range(0, len(puzzles), chunk):
+        group = puzzles[start:start + chunk]
+        size = group[0].size
+        t0 = time.monotonic()
+        cand = encode(_board_values(group), size)
+        if max_nodes > 0:
+            cand, status, rounds = branch(cand, size, max_nodes)
+        else:
+            cand, status, rounds = propagate(cand, size)
+        values = decode(cand)
+        share = (time.monotonic() - t0) / len(group)
+        for s, st, vals in zip(group, status, values):
+            stats = {"rounds": rounds, "propagated": bool(st == SOLVED)}
+            if st == CONTRADICTION:
+                results.append(solve_api.SolveResult(solve_api.UNSAT, share, stats))
+                continue
+            s.board = vals.tolist()
+            if st == SOLVED or fallback is None:
+                results.append(solve_api.SolveResult(solve_api.SOLVED if st == SOLVED else solve_api.FAILED,
+                                                     share, stats))
+                continue
+            res = solve_api.solve(s, fallback, timeout=timeout)
+            stats.update(res.stats, fallback=fallback)
+            results.append(solve_api.SolveResult(res.status, share + res.elapsed, stats))
+    return results
+
+def _solve_lockstep(s: Sudoku, control: solve_api.SolveControl, stats: dict, fallback: str = "algx",
+                    max_nodes: int = 256, **opts) -> str:
+    '''solve_api adapter: a batch of one, with the fallback under the caller's deadline.'''
+    cand, status, rounds = branch(encode(_board_values([s]), s.size), s.size, max_nodes)
+    stats["rounds"] = rounds
+    stats["propagated"] = bool(status[0] == SOLVED)
+    if status[0] == CONTRADICTION:
+        return solve_api.UNSAT
+    s.board = decode(cand)[0].tolist()
+    if status[0] == SOLVED:
+        return solve_api.SOLVED
+    control.check()
+    stats["fallback"] = fallback
+    return solve_api.SOLVERS.get(fallback)(s, control, stats, **opts)
@@ -0,0 +1,193 @@
+'''
+Per-puzzle benchmark records and regression comparison.
+
+Every solve in a Dataloader_II run can be written as one row (JSONL or CSV,
+picked from the file extension). The compare mode reads two result files and
+reports p50/p95/p99 latency and solve-rate changes per (solver, size):
+
+    python bench_results.py old.jsonl new.jsonl --max-latency-regress 0.10
+'''
+
+import argparse, csv, json, math, sys
+
+FIELDS = ["solver", "size", "file", "index", "clues", "wall_time", "solved", "peak_mem", "stats"]
+PERCENTILES = (50, 95, 99)
+
+def make_row(solver: str, size: int, file: str, index: int, clues: int,
+             wall_time: float, solved: bool, peak_mem: int | None, stats: dict) -> dict:
+    return {
+        "solver": solver,
+        "size": size,
+        "file": file,
+        "index": index,
+        "clues": clues,
+        "wall_time": wall_time,
+        "solved": bool(solved),
+        "peak_mem": peak_mem,
+        "stats": stats,
+    }
+
+class ResultWriter:
+    '''Appends result rows to a .jsonl or .csv file, flushing after each row.'''
+    def __init__(self, path: str):
+        self.path = path
+        self.is_csv = path.endswith(".csv")
+        self._f = open(path, "a+", newline="")
+        self._csv = None
+        if self._f.tell() > 0: # a run killed mid-write can leave a torn last row; start on a fresh line
+            self._f.seek(self._f.tell() - 1)
+            if self._f.read(1) != "\n":
+                self._f.write("\n")
+        if self.is_csv:
+            self._csv = csv.DictWriter(self._f, fieldnames=FIELDS)
+            if self._f.tell() == 0:
+                self._csv.writeheader()
+
+    def write(self, row: dict) -> None:
+        if self.is_csv:
+            out = dict(row)
+            out["stats"] = json.dumps(row["stats"], sort_keys=True)
+            self._csv.writerow(out)
+        else:
+            self._f.write(json.dumps(row, sort_keys=True) + "\n")
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _parse_csv_row(row: dict) -> dict:
+    return {
+        "solver": row["solver"],
+        "size": int(row["size"]),
+        "file": row["file"],
+        "index": int(row["index"]),
+        "clues": int(row["clues"]),
+        "wall_time": float(row["wall_time"]),
+        "solved": row["solved"] in {"True", "true", "1"},
+        "peak_mem": int(row["peak_mem"]) if row["peak_mem"] else None,
+        "stats": json.loads(row["stats"]) if row["stats"] else {},
+    }
+
+def read_results(path: str) -> list[dict]:
+    rows = []
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                try:
+                    rows.append(_parse_csv_row(row))
+                except (ValueError, TypeError, KeyError): # torn row from an interrupted run
+                    print(f"{path}: skipping unreadable row", file=sys.stderr)
+        else:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError: # torn row from an interrupted run
+                    print(f"{path}: skipping unreadable row", file=sys.stderr)
+    return rows
+
+def percentile(sorted_vals: list[float], q: float) -> float:
+    '''Linear-interpolated percentile of an already sorted list.'''
+    if not sorted_vals:
+        return float("nan")
+    k = (len(sorted_vals) - 1) * q / 100.0
+    lo, hi = math.floor(k), math.ceil(k)
+    if lo == hi:
+        return sorted_vals[lo]
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+def summarize(rows: list[dict]) -> dict[tuple[str, int], dict]:
+    '''Groups rows by (solver, size) and computes count, solve rate and latency percentiles.'''
+    groups: dict[tuple[str, int], list[dict]] = {}
+    for row in rows:
+        groups.setdefault((row["solver"], int(row["size"])), []).append(row)
+    summary = {}
+    for key, group in groups.items():
+        times = sorted(r["wall_time"] for r in group)
+        entry = {
+            "n": len(group),
+            "solve_rate": sum(1 for r in group if r["solved"]) / len(group),
+        }
+        for q in PERCENTILES:
+            entry[f"p{q}"] = percentile(times, q)
+        summary[key] = entry
+    return summary
+
+def compare(old_rows: list[dict], new_rows: list[dict],
+            max_latency_regress: float = 0.10, max_solve_rate_drop: float = 0.0,
+            min_latency: float = 0.0) -> tuple[list[dict], list[str]]:
+    '''
+    Compares two result sets. Returns one report entry per (solver, size) in OLD, plus a list
+    of regression messages. A latency percentile regresses when the new value is more than
+    max_latency_regress (relative) above the old one and above min_latency seconds. A group
+    with no rows in NEW (e.g. every run of it crashed) is a failure; its entry has new=None.
+    '''
+    old_sum, new_sum = summarize(old_rows), summarize(new_rows)
+    report, failures = [], []
+    for key in sorted(set(old_sum) - set(new_sum)):
+        report.append({"solver": key[0], "size": key[1], "old": old_sum[key], "new": None})
+        failures.append(f"{key[0]} n={key[1]}: missing from the new results ({old_sum[key]['n']} rows before)")
+    for key in sorted(set(old_sum) & set(new_sum)):
+        old, new = old_sum[key], new_sum[key]
+        entry = {"solver": key[0], "size": key[1], "old": old, "new": new}
+        report.append(entry)
+        label = f"{key[0]} n={key[1]}"
+        drop = old["solve_rate"] - new["solve_rate"]
+        if drop > max_solve_rate_drop:
+            failures.append(f"{label}: solve rate {old['solve_rate']:.3f} -> {new['solve_rate']:.3f}")
+        for q in PERCENTILES:
+            o, n = old[f"p{q}"], new[f"p{q}"]
+            if n > min_latency and o > 0 and (n - o) / o > max_latency_regress:
+                failures.append(f"{label}: p{q} {o:.4f}s -> {n:.4f}s ({(n - o) / o:+.1%})")
+    report.sort(key=lambda e: (e["solver"], e["size"]))
+    return report, failures
+
+def _fmt_change(o: float, n: float) -> str:
+    if o == 0:
+        return "   n/a"
+    return f"{(n - o) / o:+6.1%}"
+
+def print_report(report: list[dict]) -> None:
+    for entry in report:
+        old, new = entry["old"], entry["new"]
+        if new is None:
+            print(f"{entry['solver']} (n={entry['size']}): {old['n']} -> 0 puzzles (missing)")
+            continue
+        print(f"{entry['solver']} (n={entry['size']}): {old['n']} -> {new['n']} puzzles")
+        print(f"  solved: {old['solve_rate']:.3f} -> {new['solve_rate']:.3f}")
+        for q in PERCENTILES:
+            o, n = old[f"p{q}"], new[f"p{q}"]
+            print(f"  p{q:<3}: {o:.4f}s -> {n:.4f}s | {_fmt_change(o, n)}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--max-latency-regress", type=float, default=0.10,
+                        help="allowed relative increase of p50/p95/p99 (default 0.10)")
+    parser.add_argument("--max-solve-rate-drop", type=float, default=0.0,
+                        help="allowed absolute drop in solve rate (default 0.0)")
+    parser.add_argument("--min-latency", type=float, default=0.0,
+                        help="ignore latency regressions below this many seconds")
+    args = parser.parse_args(argv)
+
+    report, failures = compare(read_results(args.old), read_results(args.new),
+                               args.max_latency_regress, args.max_solve_rate_drop, args.min_latency)
+    print_report(report)
+    if failures:
+        print("\nRegressions:")
+        for msg in failures:
+            print(f"  {msg}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+'''
+Size-independent board encodings.
+
+Character form: one symbol per cell, '0' or '.' empty, 1-9 then A-Z for 10-35
+(the sizeN.csv format). Only boards with N <= 35 (size <= 5) fit.
+
+Token form: cell values as decimal integers separated by spaces or commas,
+0 or '.' empty. Any size; used for 36x36 and larger.
+
+Binary form: one little-endian unsigned cell value per cell, 1 byte when
+N < 256 and 2 bytes otherwise.
+'''
+
+import math, re
+
+SYMBOLS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+MAX_CHAR_LENGTH = len(SYMBOLS) - 1
+_SEPARATORS = re.compile(r"[\s,;]+")
+
+def char_to_val(ch: str) -> int:
+    ch = ch.strip()
+    if not ch or ch in {'0', '.'}:
+        return 0
+    if ch.isdigit():
+        return int(ch)
+    u = ch.upper()
+    if 'A' <= u <= 'Z':
+        return 10 + (ord(u) - ord('A'))
+    raise ValueError(f"Bad symbol '{ch}'")
+
+def token_to_val(tok: str) -> int:
+    tok = tok.strip()
+    if not tok or tok == '.':
+        return 0
+    if tok.isdigit():
+        return int(tok)
+    if len(tok) == 1: # allow character symbols mixed into token lists
+        return char_to_val(tok)
+    raise ValueError(f"Bad token '{tok}'")
+
+def parse_values(text: str, N: int) -> list[int]:
+    '''Flat list of N*N cell values from character or token form.'''
+    text = text.strip()
+    if len(text) == N * N and not _SEPARATORS.search(text):
+        values = [char_to_val(ch) for ch in text]
+    else:
+        tokens = [t for t in _SEPARATORS.split(text) if t]
+        if len(tokens) != N * N:
+            raise ValueError(f"Expected {N*N} cells, got {len(tokens)}")
+        values = [token_to_val(t) for t in tokens]
+    for v in values:
+        if v > N:
+            raise ValueError(f"Value {v} out of range for {N}x{N}")
+    return values
+
+def cell_count(text: str) -> int:
+    text = text.strip()
+    if _SEPARATORS.search(text):
+        return len([t for t in _SEPARATORS.split(text) if t])
+    return len(text)
+
+def infer_size(text: str) -> int:
+    '''Box size (3 for 9x9) from the number of cells in character or token form.'''
+    cells = cell_count(text)
+    size = math.isqrt(math.isqrt(cells))
+    if size < 1 or size ** 4 != cells:
+        raise ValueError(f"Cannot infer size from {cells} cells")
+    return size
+
+def format_values(values: list[int], N: int, tokens: bool | None = None) -> str:
+    '''Character form when it fits (or tokens=False), token form otherwise.'''
+    if tokens is None:
+        tokens = N > MAX_CHAR_LENGTH
+    if tokens:
+        return ' '.join(str(v) for v in values)
+    return ''.join(SYMBOLS[v] for v in values)
+
+def value_width(N: int) -> int:
+    return 1 if N < 256 else 2
+
+def pack_values(values: list[int], N: int) -> bytes:
+    if value_width(N) == 1:
+        return bytes(values)
+    return b''.join(v.to_bytes(2, "little") for v in values)
+
+def unpack_values(data: bytes, N: int) -> list[int]:
+    if value_width(N) == 1:
+        return list(data)
+    return [int.from_bytes(data[i:i+2], "little") for i in range(0, len(data), 2)]
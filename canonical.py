@@ -0,0 +1,149 @@
+'''
+Canonical form of Sudoku boards under the validity-preserving symmetries:
+band/stack permutations, row/column permutations inside them, transposition
+and symbol relabeling (the same transforms heterogeneous_generator.make_full_grid
+applies).
+
+Rows and columns are first sorted by invariants (clue counts, refined by the clue
+counts of the crossing lines). Only orderings consistent with those invariants are
+enumerated, and the lexicographically smallest relabeled board among them is the
+canonical form. Because the candidate set is defined by invariants, equivalent
+boards reach the same form. If the tie groups would need more than `max_candidates`
+orderings the enumeration is truncated: the key is then still a valid
+(invertible) transform of the board, but equivalent boards may get different keys.
+'''
+
+from itertools import islice, permutations
+from Sudoku import Sudoku
+
+MAX_CANDIDATES = 512
+
+class Transform:
+    '''
+    Maps a board to its canonical form:
+        canon[i][j] = relabel[src[row_order[i]][col_order[j]]], src = board (transposed first if transpose)
+    relabel is a full list over 0..N with relabel[0] == 0.
+    '''
+    def __init__(self, transpose: bool, row_order: list[int], col_order: list[int], relabel: list[int]):
+        self.transpose = transpose
+        self.row_order = row_order
+        self.col_order = col_order
+        self.relabel = relabel
+        self.unlabel = [0] * len(relabel)
+        for old, new in enumerate(relabel):
+            self.unlabel[new] = old
+
+    def apply(self, grid: list[list[int]]) -> list[list[int]]:
+        src = _transposed(grid) if self.transpose else grid
+        rl = self.relabel
+        return [[rl[src[r][c]] for c in self.col_order] for r in self.row_order]
+
+    def invert(self, canon: list[list[int]]) -> list[list[int]]:
+        N = len(canon)
+        src = [[0] * N for _ in range(N)]
+        ul = self.unlabel
+        for i, r in enumerate(self.row_order):
+            row = canon[i]
+            out = src[r]
+            for j, c in enumerate(self.col_order):
+                out[c] = ul[row[j]]
+        return _transposed(src) if self.transpose else src
+
+def _transposed(grid: list[list[int]]) -> list[list[int]]:
+    return [list(col) for col in zip(*grid)]
+
+def _lazy_product(factories: list):
+    '''
+    itertools.product over iterables made on demand by zero-argument factories. product()
+    materializes every input first, which for large tie groups is already too much work.
+    '''
+    if not factories:
+        yield ()
+        return
+    for head in factories[0]():
+        for tail in _lazy_product(factories[1:]):
+            yield (head,) + tail
+
+def _runs(items: list[int], key: list) -> list[list[int]]:
+    '''Splits key-sorted items into runs of equal key.'''
+    runs, i = [], 0
+    while i < len(items):
+        j = i
+        while j < len(items) and key[items[j]] == key[items[i]]:
+            j += 1
+        runs.append(items[i:j])
+        i = j
+    return runs
+
+def _iter_orders(grid: list[list[int]], size: int):
+    '''
+    Yields the candidate row orders lazily: bands sorted by band key and rows inside a band
+    sorted by row key, with every permutation of a tie group of bands and of an equal-key
+    run of rows inside a band.
+    '''
+    N = size * size
+    row_count = [sum(1 for v in row if v) for row in grid]
+    col_count = [sum(1 for r in range(N) if grid[r][c]) for c in range(N)]
+    row_key = [(row_count[r], tuple(sorted(col_count[c] for c in range(N) if grid[r][c]))) for r in range(N)]
+    band_key = [tuple(sorted(row_key[b*size + k] for k in range(size))) for b in range(size)]
+
+    band_groups = _runs(sorted(range(size), key=lambda b: band_key[b]), band_key)
+    row_runs = [_runs(sorted(range(b*size, (b+1)*size), key=lambda r: row_key[r]), row_key) for b in range(size)]
+    for band_choice in _lazy_product([lambda g=g: permutations(g) for g in band_groups]):
+        runs = [run for group in band_choice for b in group for run in row_runs[b]]
+        for rows in _lazy_product([lambda r=r: permutations(r) for r in runs]):
+            yield [r for run in rows for r in run]
+
+def _orders(grid: list[list[int]], size: int, limit: int) -> list[list[int]]:
+    return list(islice(_iter_orders(grid, size), limit))
+
+def _relabeled(src: list[list[int]], rows: list[int], cols: list[int], N: int,
+               best: list[int] | None) -> tuple[list[int], list[int]] | None:
+    '''Flattened first-appearance relabeling; None as soon as it compares above `best`.'''
+    relabel = [0] * (N + 1)
+    nxt = 1
+    flat = []
+    k = 0
+    smaller = best is None
+    for r in rows:
+        row = src[r]
+        for c in cols:
+            v = row[c]
+            if v:
+                if not relabel[v]:
+                    relabel[v] = nxt
+                    nxt += 1
+                v = relabel[v]
+            if not smaller:
+                b = best[k]
+                if v > b:
+                    return None
+                if v < b:
+                    smaller = True
+            flat.append(v)
+            k += 1
+    if not smaller:
+        return None # equal to best
+    for old in range(1, N + 1): # symbols absent from the clues keep their relative order
+        if not relabel[old]:
+            relabel[old] = nxt
+            nxt += 1
+    return flat, relabel
+
+def canonicalize(s: Sudoku, max_candidates: int = MAX_CANDIDATES) -> tuple[str, Transform]:
+    '''Returns (key, transform) with transform.apply(s.board) == the canonical board.'''
+    n, N = s.size, s.length
+    grid = [[v if s.fixed[r][c] else 0 for c, v in enumerate(row)] for r, row in enumerate(s.board)]
+    best, best_t = None, None
+    for transpose in (False, True):
+        src = _transposed(grid) if transpose else grid
+        row_orders = _orders(src, n, max_candidates)
+        col_orders = _orders(_transposed(src), n, max(1, max_candidates // len(row_orders)))
+        for rows in row_orders:
+            for cols in col_orders:
+                res = _relabeled(src, rows, cols, N, best)
+                if res is not None:
+                    best = res[0]
+                    best_t = Transform(transpose, rows, cols, res[1])
+    key = f"{n}:" + ",".join(map(str, best))
+    return key, best_t
@@ -1,19 +1,52 @@
-import random
-import csv
+'''
+Puzzle generator.
 
-random.seed(14)
+    python heterogeneous_generator.py --size 4 --count 100000 --clues 110 --workers 8 --out size4.csv
+    python heterogeneous_generator.py --size 5 --count 1000000 --out size5.bin
+
+Every puzzle is dug out of a shuffled full grid, a block of clues at a time while
+the grid is dense and one clue at a time once blocks start failing; a removal is
+kept only if the early-stopping solution counter still finds exactly one
+solution. Work is spread over processes and written out as it arrives, to CSV
+(header 'puzzle', same format as sizeN.csv) or to a binary store (.bin, see
+write_binary_header). Puzzle i is generated from seed (seed, i), so output does
+not depend on the number of workers.
+
+With no arguments it regenerates size2.csv .. size5.csv (1000 puzzles each).
+'''
+
+import argparse, csv, math, multiprocessing, random, struct, sys, time
+import board_codec
+from solution_counter import has_other_solution, is_unique
+
+SEED = 14
 
 clue_numbers = {2:6, 3:20, 4:110, 5:230}
+CLUE_RATIO = 0.45 # clue target for sizes without an entry in clue_numbers
+# Search node budget (branch points) per uniqueness check. Undecided removals are undone, so a
+# small budget trades a few extra clues for bounded time on large boards. On 25x25 a budget of
+# 1000 takes ~100x longer than 5 and ends only ~5 clues lower (~275, above the 230 target:
+# most late removals are undecidable at any budget this search can afford).
+max_nodes_default = {2:None, 3:None, 4:200, 5:5}
+LARGE_MAX_NODES = 5
+SYMBOLS = board_codec.SYMBOLS
 all_digits = {
-    2:{1,2,3,4},
-    3:{1,2,3,4,5,6,7,8,9},
-    4:{1,2,3,4,5,6,7,8,9,'A','B','C','D','E','F','G'},
-    5:{1,2,3,4,5,6,7,8,9,'A','B','C','D','E','F','G','H','I','J','K','L','M','N','O','P'}
+    2:[1,2,3,4],
+    3:[1,2,3,4,5,6,7,8,9],
+    4:[1,2,3,4,5,6,7,8,9,'A','B','C','D','E','F','G'],
+    5:[1,2,3,4,5,6,7,8,9,'A','B','C','D','E','F','G','H','I','J','K','L','M','N','O','P']
 }
 
-def make_full_grid(size):
+def digits(size: int) -> list:
+    '''Cell symbols for a size: the sizeN.csv characters up to 5, plain ints beyond.'''
+    return all_digits.get(size) or list(range(1, size * size + 1))
+
+def clue_target(size: int) -> int:
+    return clue_numbers.get(size) or round(CLUE_RATIO * size ** 4)
+
+def make_full_grid(size, rng=random):
     N = size * size
-    symbols = list(all_digits[size])
+    symbols = list(digits(size))
 
     # deterministic valid base grid via pattern
     def pattern(r, c):
@@ -23,25 +56,25 @@ def make_full_grid(size):
 
     # shuffle bands and rows within bands
     band_starts = list(range(0, N, size))
-    random.shuffle(band_starts)
+    rng.shuffle(band_starts)
     row_order = []
     for b in band_starts:
         band_rows = list(range(b, b + size))
-        random.shuffle(band_rows)
+        rng.shuffle(band_rows)
         row_order.extend(band_rows)
 
     # shuffle stacks and cols within stacks
     stack_starts = list(range(0, N, size))
-    random.shuffle(stack_starts)
+    rng.shuffle(stack_starts)
     col_order = []
     for s in stack_starts:
         stack_cols = list(range(s, s + size))
-        random.shuffle(stack_cols)
+        rng.shuffle(stack_cols)
         col_order.extend(stack_cols)
 
     # optional: permute symbols for extra randomness
     perm = symbols[:]
-    random.shuffle(perm)
+    rng.shuffle(perm)
     mapping = {symbols[i]: perm[i] for i in range(N)}
 
     grid = [
@@ -50,30 +83,241 @@ def make_full_grid(size):
     ]
     return grid
 
-def make_puzzle(size):
-    full = make_full_grid(size)
+def make_full_grids(size: int, batch: int, rng=None, transpose: bool = True, chunk: int = 1 << 16):
+    '''
+    Vectorized make_full_grid: B solved grids at once as a (B, N, N) array of values 1..N
+    (uint8, or uint16 when N >= 256).
+    Band/stack, row/column and symbol permutations are drawn for the whole batch (argsort of
+    uniform noise) and applied by fancy indexing into the pattern base grid; with transpose,
+    each grid is transposed with probability 1/2. Work is done `chunk` grids at a time to
+    bound the index temporaries. rng: numpy Generator or seed.
+    '''
+    import numpy as np
+    rng = np.random.default_rng(rng)
+    n, N = size, size * size
+    r = np.arange(N)
+    dtype = np.uint8 if N < 256 else np.uint16
+    base = (n * (r[:, None] % n) + r[:, None] // n + r[None, :]) % N + 1
+    out = np.empty((batch, N, N), dtype=dtype)
+
+    def line_orders(B):
+        bands = np.argsort(rng.random((B, n)), axis=1)
+        inner = np.argsort(rng.random((B, n, n)), axis=2)
+        return (bands[:, :, None] * n + inner).reshape(B, N)
+
+    for start in range(0, batch, chunk):
+        B = min(chunk, batch - start)
+        rows, cols = line_orders(B), line_orders(B)
+        symbols = np.zeros((B, N + 1), dtype=dtype)
+        symbols[:, 1:] = np.argsort(rng.random((B, N)), axis=1) + 1
+        grids = base[rows[:, :, None], cols[:, None, :]]
+        grids = symbols[np.arange(B)[:, None, None], grids]
+        if transpose:
+            flip = rng.random(B) < 0.5
+            grids[flip] = grids[flip].transpose(0, 2, 1)
+        out[start:start + B] = grids
+    return out
+
+def make_puzzle(size, rng=random):
+    '''Random clue removal without a uniqueness check (the original generator).'''
+    full = make_full_grid(size, rng)
     N = size*size
     total_cells = N*N
-    clues = clue_numbers[size]
+    clues = clue_target(size)
     blanks = total_cells - clues
 
     grid = [row[:] for row in full]
     coords = [(r, c) for r in range(N) for c in range(N)]
-    random.shuffle(coords)
+    rng.shuffle(coords)
 
     for k in range(blanks):
         r, c = coords[k]
         grid[r][c] = 0
 
-    grid_string = ''.join(str(x) for row in grid for x in row)
+    grid_string = board_codec.format_values([_symbol_value(x) for row in grid for x in row], N)
     return grid_string
 
-for size in [2, 3, 4, 5]:
-    filename = f"size{size}.csv"
-    with open(filename, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['puzzle'])
-        for _ in range(1000):
-            puzzle = make_puzzle(size)
-            writer.writerow([puzzle])
-    print(f"Wrote 1000 puzzles of size {size} to {filename}")
+def _symbol_value(x) -> int:
+    return x if isinstance(x, int) else SYMBOLS.index(x)
+
+def encode_values(values: list[int]) -> str:
+    N = math.isqrt(len(values))
+    return board_codec.format_values(values, N)
+
+def make_unique_puzzle(size: int, clues: int, rng: random.Random, max_nodes: int | None = None,
+                       full: list[int] | None = None, block: int | None = None) -> list[int]:
+    '''
+    Digs a full grid (flat values, drawn with make_full_grid if not given) down towards `clues`
+    clues, keeping only removals that leave a unique solution. Cells go in shuffled order,
+    `block` (default N) at a time with one uniqueness check per block. A block that fails, or
+    that the counter cannot decide within max_nodes, is put back and retried at half the size;
+    single cells that fail are put back and skipped. Returns the flat value list (0 = empty); it
+    may keep more clues than asked when no further removal is safe.
+    '''
+    N = size * size
+    if full is None:
+        grid = [_symbol_value(x) for row in make_full_grid(size, rng) for x in row]
+    else:
+        grid = list(full)
+    order = list(range(N * N))
+    rng.shuffle(order)
+    remaining = N * N
+    block = block or N
+    pos = 0
+    while remaining > clues and pos < len(order):
+        k = min(block, remaining - clues, len(order) - pos)
+        cells = order[pos:pos + k]
+        values = [grid[i] for i in cells]
+        for i in cells:
+            grid[i] = 0
+        if k == 1:
+            ok = has_other_solution(grid, size, cells[0], values[0], max_nodes) is False
+        else:
+            ok = is_unique(grid, size, max_nodes) is True
+        if ok:
+            remaining -= k
+            pos += k
+            continue
+        for i, v in zip(cells, values):
+            grid[i] = v
+        if k == 1:
+            pos += 1
+        else:
+            block = k // 2 # blocks only shrink: once one fails, large checks stay expensive
+    return grid
+
+def _task(args) -> list[int]:
+    size, clues, seed, index, unique, max_nodes, full = args
+    rng = random.Random(f"{seed}:{size}:{index}")
+    if unique:
+        return make_unique_puzzle(size, clues, rng, max_nodes, full)
+    if full is not None:
+        order = list(range(len(full)))
+        rng.shuffle(order)
+        grid = list(full)
+        for i in order[:len(full) - clues]:
+            grid[i] = 0
+        return grid
+    return board_codec.parse_values(make_puzzle(size, rng), size * size)
+
+GRID_BLOCK = 4096
+
+def _tasks(size: int, count: int, clues: int, seed: int, unique: bool, max_nodes: int | None, numpy_grids: bool):
+    if not numpy_grids:
+        for i in range(count):
+            yield (size, clues, seed, i, unique, max_nodes, None)
+        return
+    # full grids drawn in vectorized blocks, block b seeded from (seed, size, b)
+    for block, start in enumerate(range(0, count, GRID_BLOCK)):
+        B = min(GRID_BLOCK, count - start)
+        grids = make_full_grids(size, B, [seed, size, block]).reshape(B, -1)
+        for k in range(B):
+            yield (size, clues, seed, start + k, unique, max_nodes, grids[k].tolist())
+
+# Binary store: 16-byte header, then one record of N*N cell values per puzzle (0 = empty),
+# 1 byte each, or 2 (little-endian) when N >= 256 -- see board_codec.pack_values.
+BINARY_MAGIC = b"SUDK"
+BINARY_HEADER = struct.Struct("<4sHHQ") # magic, version, size, reserved
+
+def write_binary_header(f, size: int) -> None:
+    f.write(BINARY_HEADER.pack(BINARY_MAGIC, 1, size, 0))
+
+def iter_binary(path: str):
+    '''Yields flat value lists from a .bin store.'''
+    with open(path, "rb") as f:
+        magic, _, size, _ = BINARY_HEADER.unpack(f.read(BINARY_HEADER.size))
+        if magic != BINARY_MAGIC:
+            raise ValueError(f"{path} is not a puzzle store")
+        N = size * size
+        rec = N * N * board_codec.value_width(N)
+        while True:
+            data = f.read(rec)
+            if len(data) < rec:
+                return
+            yield board_codec.unpack_values(data, N)
+
+class PuzzleWriter:
+    '''Streams puzzles to CSV or, for a .bin path, to the binary store.'''
+    def __init__(self, path: str, size: int):
+        self.N = size * size
+        self.binary = path.endswith(".bin")
+        self._f = open(path, "wb" if self.binary else "w", newline="" if not self.binary else None)
+        if self.binary:
+            write_binary_header(self._f, size)
+        else:
+            self._csv = csv.writer(self._f)
+            self._csv.writerow(['puzzle'])
+
+    def write(self, values: list[int]) -> None:
+        if self.binary:
+            self._f.write(board_codec.pack_values(values, self.N))
+        else:
+            self._csv.writerow([board_codec.format_values(values, self.N)])
+
+    def close(self) -> None:
+        self._f.close()
+
+def generate(size: int, count: int, out: str, clues: int | None = None, seed: int = SEED,
+             workers: int = 1, unique: bool = True, max_nodes: int | None = None,
+             progress: bool = True, numpy_grids: bool = False) -> dict:
+    clues = clue_target(size) if clues is None else clues
+    if max_nodes is None:
+        max_nodes = max_nodes_default.get(size, LARGE_MAX_NODES)
+    elif max_nodes <= 0:
+        max_nodes = None
+    tasks = _tasks(size, count, clues, seed, unique, max_nodes, numpy_grids)
+    writer = PuzzleWriter(out, size)
+    start = time.perf_counter()
+    written = total_clues = missed = max_clues = 0
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        if pool is not None:
+            results = pool.imap(_task, tasks, chunksize=max(1, min(64, count // (workers * 8))))
+        else:
+            results = map(_task, tasks)
+        for values in results:
+            writer.write(values)
+            written += 1
+            n_clues = sum(1 for v in values if v)
+            total_clues += n_clues
+            missed += n_clues > clues
+            max_clues = max(max_clues, n_clues)
+            if progress and written % 1000 == 0:
+                rate = written / (time.perf_counter() - start)
+                print(f"  {written}/{count} puzzles ({rate:.1f}/s)", file=sys.stderr)
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.terminate()
+    elapsed = time.perf_counter() - start
+    return {"count": written, "seconds": elapsed, "avg_clues": total_clues / max(1, written),
+            "clue_target": clues, "missed_target": missed, "max_clues": max_clues}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate Sudoku puzzles with a unique solution.")
+    parser.add_argument("--size", type=int, nargs="+", default=[2, 3, 4, 5], help="box size(s), 3 means 9x9")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--clues", type=int, help="clue target (default: clue_numbers, or 45%% of cells)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--workers", type=int, default=1, help="processes (0 = all cores)")
+    parser.add_argument("--out", default="size{size}.csv", help="output path; .bin selects the binary store")
+    parser.add_argument("--no-unique", action="store_true", help="skip the uniqueness check (random removal)")
+    parser.add_argument("--numpy-grids", action="store_true",
+                        help="draw the full grids in bulk with make_full_grids (needs NumPy)")
+    parser.add_argument("--max-nodes", type=int, help="search node budget per uniqueness check (default per size, 0 = unlimited)")
+    args = parser.parse_args(argv)
+
+    workers = args.workers or multiprocessing.cpu_count()
+    for size in args.size:
+        out = args.out.format(size=size)
+        info = generate(size, args.count, out, args.clues, args.seed, workers, not args.no_unique, args.max_nodes,
+                        numpy_grids=args.numpy_grids)
+        print(f"Wrote {info['count']} puzzles of size {size} to {out} "
+              f"({info['seconds']:.1f}s, {info['avg_clues']:.1f} clues avg)")
+        if info["missed_target"]:
+            print(f"  {info['missed_target']}/{info['count']} puzzles kept more than the {info['clue_target']} "
+                  f"clue target (up to {info['max_clues']})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
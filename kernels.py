@@ -0,0 +1,399 @@
+'''
+Optional compiled kernels for the annealer's inner loop and an array-based DLX.
+
+With Numba installed the kernels are compiled with njit on first use; without it, or
+with SUDOKU_JIT=0 in the environment, the very same functions run as plain Python.
+The kernels only use integer arithmetic and their own xorshift32 RNG, so for a given
+seed both backends produce identical results; only the speed differs.
+
+    solve_api.solve(s, "simanneal_jit", seed=1)
+    solve_api.solve(s, "algx_jit")
+
+Annealing: the propose/score/accept cycle runs in sa_steps over int arrays, with row
+and column value counts kept up to date so a swap is scored in O(1). The rare events
+(local brute force, reheat with focused swaps) return to SimulatedAnnealing's Python
+methods. DLX: the exact-cover matrix is stored as L/R/U/D/C link arrays and searched
+iteratively with an explicit choice stack, a node budget at a time.
+'''
+
+import math, os
+import numpy as np
+import solve_api
+
+if os.environ.get("SUDOKU_JIT", "1") != "0":
+    try:
+        from numba import njit
+    except ImportError:
+        njit = None
+else:
+    njit = None
+
+HAVE_NUMBA = njit is not None
+BACKEND = "numba" if HAVE_NUMBA else "python"
+
+if njit is None:
+    def njit(*args, **kwargs):
+        '''Identity decorator standing in for numba.njit.'''
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda f: f
+
+MASK32 = 0xFFFFFFFF
+
+def seed_state(seed: int) -> np.ndarray:
+    '''xorshift32 state (a 1-element int64 array, never 0) from any integer seed.'''
+    x = (int(seed) * 2654435761 + 0x9E3779B9) & MASK32
+    return np.array([x or 1], dtype=np.int64)
+
+@njit(cache=True)
+def xorshift32(state):
+    x = state[0]
+    x ^= (x << 13) & 0xFFFFFFFF
+    x ^= x >> 17
+    x ^= (x << 5) & 0xFFFFFFFF
+    state[0] = x
+    return x
+
+# --- annealing -------------------------------------------------------------
+
+# sa_steps return codes
+SA_CHUNK, SA_SOLVED, SA_MAX_ITERS, SA_EVENT = 0, 1, 2, 3
+# layout of the int state array shared with Python
+I_ITERS, I_SINCE, I_BEST, I_ERROR, I_TRIED_BF, I_REHEATS, I_STEPS = range(7)
+
+@njit(cache=True)
+def _dup(k):
+    return k if k > 1 else 0
+
+@njit(cache=True)
+def _line_delta(cnt, lose, gain):
+    # one line gives up `lose` and takes `gain`: change in sum of counts > 1
+    return (_dup(cnt[lose] - 1) + _dup(cnt[gain] + 1)) - (_dup(cnt[lose]) + _dup(cnt[gain]))
+
+@njit(cache=True)
+def swap_delta(grid, row_cnt, col_cnt, r1, c1, r2, c2):
+    '''Change in the row + column duplicate count if (r1, c1) and (r2, c2) swap values.'''
+    v1 = grid[r1, c1]
+    v2 = grid[r2, c2]
+    if v1 == v2:
+        return 0
+    d = 0
+    if r1 != r2:
+        d += _line_delta(row_cnt[r1], v1, v2) + _line_delta(row_cnt[r2], v2, v1)
+    if c1 != c2:
+        d += _line_delta(col_cnt[c1], v1, v2) + _line_delta(col_cnt[c2], v2, v1)
+    return d
+
+@njit(cache=True)
+def _apply_swap(grid, row_cnt, col_cnt, r1, c1, r2, c2):
+    v1 = grid[r1, c1]
+    v2 = grid[r2, c2]
+    row_cnt[r1, v1] -= 1
+    row_cnt[r1, v2] += 1
+    row_cnt[r2, v2] -= 1
+    row_cnt[r2, v1] += 1
+    col_cnt[c1, v1] -= 1
+    col_cnt[c1, v2] += 1
+    col_cnt[c2, v2] -= 1
+    col_cnt[c2, v1] += 1
+    grid[r1, c1] = v2
+    grid[r2, c2] = v1
+
+@njit(cache=True)
+def sa_steps(grid, row_cnt, col_cnt, legal, box_cells, box_len, n, ints, floats, rng, steps,
+             max_iters, n_plateau, max_reheats, decay, min_t, legal_moves, free_swap_prob, partners):
+    '''
+    Runs up to `steps` annealing iterations. Returns SA_SOLVED / SA_MAX_ITERS when done,
+    SA_EVENT after the swap of an iteration that needs brute force or a reheat (Python
+    finishes that iteration), SA_CHUNK when the step budget is used up.
+    '''
+    ints[I_STEPS] = 0
+    for _ in range(steps):
+        if ints[I_ERROR] <= 0:
+            return SA_SOLVED
+        if ints[I_ITERS] >= max_iters:
+            return SA_MAX_ITERS
+        ints[I_STEPS] += 1
+
+        # propose: two free cells of a random box (legal exchanges only with legal_moves,
+        # except for a free_swap_prob share that keeps every box filling reachable)
+        b = (xorshift32(rng) % n) * n + xorshift32(rng) % n
+        m = box_len[b]
+        if m >= 2:
+            restrict = legal_moves and xorshift32(rng) / 4294967296.0 >= free_swap_prob
+            i = xorshift32(rng) % m
+            r1 = box_cells[b, i, 0]
+            c1 = box_cells[b, i, 1]
+            k = 0
+            for j in range(m):
+                if j == i:
+                    continue
+                r = box_cells[b, j, 0]
+                c = box_cells[b, j, 1]
+                if not restrict or (legal[r1, c1, grid[r, c]] and legal[r, c, grid[r1, c1]]):
+                    partners[k] = j
+                    k += 1
+            if k > 0:
+                j = partners[xorshift32(rng) % k]
+                r2 = box_cells[b, j, 0]
+                c2 = box_cells[b, j, 1]
+                # score / accept
+                delta = swap_delta(grid, row_cnt, col_cnt, r1, c1, r2, c2)
+                u = xorshift32(rng) / 4294967296.0
+                if delta < 0 or u < math.exp(-delta / max(floats[0], 1e-9)):
+                    _apply_swap(grid, row_cnt, col_cnt, r1, c1, r2, c2)
+                    ints[I_ERROR] += delta
+
+        if ints[I_ERROR] < ints[I_BEST]:
+            ints[I_BEST] = ints[I_ERROR]
+            ints[I_SINCE] = 0
+        else:
+            ints[I_SINCE] += 1
+        if ints[I_ERROR] <= 4 and n > 3 and ints[I_TRIED_BF] == 0:
+            return SA_EVENT
+        if ints[I_SINCE] >= n_plateau and ints[I_REHEATS] < max_reheats:
+            return SA_EVENT
+        floats[0] = max(floats[0] * decay, min_t)
+        ints[I_ITERS] += 1
+    return SA_CHUNK
+
+def _line_counts(grid: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    N = grid.shape[0]
+    row_cnt = np.zeros((N, N + 1), dtype=np.int64)
+    col_cnt = np.zeros((N, N + 1), dtype=np.int64)
+    idx = np.arange(N)[:, None]
+    np.add.at(row_cnt, (np.broadcast_to(idx, grid.shape), grid), 1)
+    np.add.at(col_cnt, (np.broadcast_to(idx.T, grid.shape), grid), 1)
+    return row_cnt, col_cnt
+
+def anneal(sa, max_iters: int = 8*(10**6), control=None, seed: int = 0, display: bool = False,
+           chunk: int = 4096) -> int:
+    '''
+    SimulatedAnnealing.solve with the inner loop in sa_steps. sa: a SimulatedAnnealing
+    (its RNG drives the initial fill and the Python-side events, seed the kernel RNG).
+    '''
+    N, n = sa.length, sa.n
+    sa.grid = np.ascontiguousarray(sa.grid, dtype=np.int64)
+    legal = np.zeros((N, N, N + 1), dtype=np.bool_)
+    for r in range(N):
+        for c in range(N):
+            legal[r, c, list(sa.legal[r][c])] = True
+    box_len = np.array([len(cells) for cells in sa.box_free], dtype=np.int64)
+    box_cells = np.zeros((n * n, N, 2), dtype=np.int64)
+    for b, cells in enumerate(sa.box_free):
+        if cells:
+            box_cells[b, :len(cells)] = cells
+    partners = np.zeros(N, dtype=np.int64)
+    rng = seed_state(seed)
+    best = -1 if math.isinf(sa.best_error) else int(sa.best_error)
+    ints = np.array([sa.iters, sa.iters_since_improvement, best, sa.error_count, sa.tried_BF, sa.reheats, 0],
+                    dtype=np.int64)
+    if best < 0:
+        ints[I_BEST] = np.iinfo(np.int64).max
+    floats = np.array([sa.T], dtype=np.float64)
+    steps = chunk if control is None else min(chunk, control.check_every)
+
+    def pull():
+        sa.iters = int(ints[I_ITERS])
+        sa.iters_since_improvement = int(ints[I_SINCE])
+        sa.best_error = int(ints[I_BEST]) if ints[I_BEST] != np.iinfo(np.int64).max else float('inf')
+        sa.error_count = int(ints[I_ERROR])
+        sa.tried_BF = bool(ints[I_TRIED_BF])
+        sa.reheats = int(ints[I_REHEATS])
+        sa.T = float(floats[0])
+
+    def push():
+        ints[:I_STEPS] = [sa.iters, sa.iters_since_improvement,
+                          np.iinfo(np.int64).max if math.isinf(sa.best_error) else sa.best_error,
+                          sa.error_count, sa.tried_BF, sa.reheats]
+        floats[0] = sa.T
+
+    row_cnt, col_cnt = _line_counts(sa.grid)
+    while True:
+        code = sa_steps(sa.grid, row_cnt, col_cnt, legal, box_cells, box_len, n, ints, floats, rng, steps,
+                        max_iters, sa.N_plateau, sa.max_reheats, sa.decay, sa.MIN_T, sa.legal_moves,
+                        sa.free_swap_prob, partners)
+        pull()
+        if control is not None:
+            control.tick(int(ints[I_STEPS]))
+        if code in (SA_SOLVED, SA_MAX_ITERS):
+            break
+        if code == SA_EVENT:
+            if sa.step_events(display):
+                break
+            sa.T = max(sa.T * sa.decay, sa.MIN_T)
+            sa.iters += 1
+            push()
+            row_cnt, col_cnt = _line_counts(sa.grid)
+    sa.sudoku.board = sa.grid.tolist()
+    return sa.iters
+
+def _solve_simanneal_jit(s, control, stats: dict, max_iters: int = 8*(10**6), seed: int | None = None, **opts) -> str:
+    import SimAl
+    seed = 0 if seed is None else seed
+    solver = SimAl.SimulatedAnnealing(s, seed=seed, **opts)
+    stats["backend"] = BACKEND
+    try:
+        anneal(solver, max_iters, control, seed)
+    finally:
+        stats["iters"] = solver.iters
+        stats["reheats"] = solver.reheats
+        stats["errors"] = int(solver.error_count)
+    return solve_api.SOLVED if s.isComplete() else solve_api.FAILED
+
+# --- array DLX -------------------------------------------------------------
+
+@njit(cache=True)
+def dlx_build(N, n):
+    '''
+    Sudoku exact-cover links. Column 0 is the root; columns 1..4N^2 are cell, row-digit,
+    col-digit and box-digit constraints. Choice (r, c, d) owns nodes base + 4k .. base + 4k + 3
+    with k = (r*N + c)*N + d-1 and base = 4N^2 + 1.
+    '''
+    N2 = N * N
+    ncols = 4 * N2
+    total = ncols + 1 + 4 * N2 * N
+    L = np.empty(total, dtype=np.int64)
+    R = np.empty(total, dtype=np.int64)
+    U = np.empty(total, dtype=np.int64)
+    D = np.empty(total, dtype=np.int64)
+    C = np.empty(total, dtype=np.int64)
+    S = np.zeros(ncols + 1, dtype=np.int64)
+    for i in range(ncols + 1):
+        L[i] = i - 1 if i > 0 else ncols
+        R[i] = i + 1 if i < ncols else 0
+        U[i] = i
+        D[i] = i
+        C[i] = i
+    base = ncols + 1
+    for r in range(N):
+        for c in range(N):
+            b = (r // n) * n + c // n
+            for d in range(N):
+                k = (r * N + c) * N + d
+                node = base + 4 * k
+                cols = (1 + r * N + c, 1 + N2 + r * N + d, 1 + 2 * N2 + c * N + d, 1 + 3 * N2 + b * N + d)
+                for j in range(4):
+                    x = node + j
+                    col = cols[j]
+                    C[x] = col
+                    U[x] = U[col]
+                    D[x] = col
+                    D[U[col]] = x
+                    U[col] = x
+                    S[col] += 1
+                    L[x] = node + (j + 3) % 4
+                    R[x] = node + (j + 1) % 4
+    return L, R, U, D, C, S
+
+@njit(cache=True)
+def dlx_cover(L, R, U, D, C, S, c):
+    L[R[c]] = L[c]
+    R[L[c]] = R[c]
+    i = D[c]
+    while i != c:
+        j = R[i]
+        while j != i:
+            U[D[j]] = U[j]
+            D[U[j]] = D[j]
+            S[C[j]] -= 1
+            j = R[j]
+        i = D[i]
+
+@njit(cache=True)
+def dlx_uncover(L, R, U, D, C, S, c):
+    i = U[c]
+    while i != c:
+        j = L[i]
+        while j != i:
+            S[C[j]] += 1
+            U[D[j]] = j
+            D[U[j]] = j
+            j = L[j]
+        i = U[i]
+    L[R[c]] = c
+    R[L[c]] = c
+
+@njit(cache=True)
+def dlx_select(L, R, U, D, C, S, node):
+    '''Places a clue: covers every column of node's choice. False if one is already covered.'''
+    j = node
+    while True:
+        c = C[j]
+        if R[L[c]] != c:
+            return False
+        dlx_cover(L, R, U, D, C, S, c)
+        j = R[j]
+        if j == node:
+            return True
+
+@njit(cache=True)
+def dlx_search(L, R, U, D, C, S, stack, depth, budget):
+    '''
+    Iterative Algorithm X from a choice stack of `depth` nodes. Returns (depth, nodes
+    visited, status): 1 solved (stack[:depth] is the solution), 0 no solution, -1 the
+    budget ran out (call again with the returned depth to continue).
+    '''
+    nodes = 0
+    while True:
+        if R[0] == 0:
+            return depth, nodes, 1
+        if nodes >= budget:
+            return depth, nodes, -1
+        nodes += 1
+        # fewest-rows column, first one found on ties (as AlgX.search)
+        c = R[0]
+        best = c
+        j = R[c]
+        while j != 0:
+            if S[j] < S[best]:
+                best = j
+            j = R[j]
+        c = best
+        dlx_cover(L, R, U, D, C, S, c)
+        r = D[c]
+        while r == c:
+            # column exhausted: undo it and move the previous choice to its next row
+            dlx_uncover(L, R, U, D, C, S, c)
+            if depth == 0:
+                return 0, nodes, 0
+            depth -= 1
+            r = stack[depth]
+            j = L[r]
+            while j != r:
+                dlx_uncover(L, R, U, D, C, S, C[j])
+                j = L[j]
+            c = C[r]
+            r = D[r]
+        stack[depth] = r
+        depth += 1
+        j = R[r]
+        while j != r:
+            dlx_cover(L, R, U, D, C, S, C[j])
+            j = R[j]
+
+def _solve_algx_jit(s, control, stats: dict, **opts) -> str:
+    N, n = s.length, s.size
+    L, R, U, D, C, S = dlx_build(N, n)
+    base = 4 * N * N + 1
+    stats["backend"] = BACKEND
+    for r in range(N):
+        for c in range(N):
+            d = s.board[r][c]
+            if d and not dlx_select(L, R, U, D, C, S, base + 4 * ((r * N + c) * N + d - 1)):
+                return solve_api.UNSAT
+    stack = np.zeros(N * N + 1, dtype=np.int64)
+    depth, visited, status = 0, 0, -1
+    budget = control.check_every if control is not None else 1 << 62
+    while status < 0:
+        depth, nodes, status = dlx_search(L, R, U, D, C, S, stack, depth, budget)
+        visited += nodes
+        stats["nodes"] = visited
+        if control is not None:
+            control.tick(nodes)
+    if status == 0:
+        return solve_api.UNSAT
+    for node in stack[:depth]:
+        k = (int(node) - base) // 4
+        s.board[k // (N * N)][(k // N) % N] = k % N + 1
+    return solve_api.SOLVED if s.isComplete() else solve_api.UNSAT
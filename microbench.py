@@ -0,0 +1,204 @@
+'''
+Microbenchmarks for the solver hot primitives.
+
+Each primitive is set up on a fixed-seed board for sizes 2..5 and timed in
+isolation. Reports per-call latency, calls per second, tracemalloc peak bytes
+per call and blocks retained per call, and can save/compare a JSON baseline:
+
+    python microbench.py --save baseline.json
+    python microbench.py --baseline baseline.json --only cover_uncover
+'''
+
+import argparse, gc, json, random, sys, time, tracemalloc
+from Sudoku import Sudoku
+
+SIZES = (2, 3, 4, 5)
+CLUE_RATIO = 0.4
+
+def make_board(size: int, seed: int, clue_ratio: float = CLUE_RATIO) -> tuple[Sudoku, list[list[int]]]:
+    '''Seeded puzzle (and its full solution) built from the pattern grid.'''
+    rng = random.Random(seed)
+    N = size * size
+    rows = [b * size + r for b in rng.sample(range(size), size) for r in rng.sample(range(size), size)]
+    cols = [b * size + c for b in rng.sample(range(size), size) for c in rng.sample(range(size), size)]
+    symbols = rng.sample(range(1, N + 1), N)
+    full = [[symbols[(size * (r % size) + r // size + c) % N] for c in cols] for r in rows]
+    s = Sudoku(size)
+    for r in range(N):
+        for c in range(N):
+            if rng.random() < clue_ratio:
+                s.board[r][c] = full[r][c]
+                s.fixed[r][c] = True
+    return s, full
+
+# Each setup returns a zero-argument callable that performs one call of the primitive.
+
+def setup_isValid(size: int, seed: int):
+    s, full = make_board(size, seed)
+    s.board = [row[:] for row in full] # full valid grid: isValid scans every unit
+    return s.isValid
+
+def setup_cover_uncover(size: int, seed: int):
+    import AlgX
+    s, _ = make_board(size, seed)
+    root = AlgX.genLinkList(s)
+    cols = []
+    c = root.right
+    while c is not root:
+        cols.append(c)
+        c = c.right
+    rng = random.Random(seed)
+    order = [rng.choice(cols) for _ in range(1024)]
+    state = {"i": 0}
+    def call():
+        col = order[state["i"] & 1023]
+        state["i"] += 1
+        col.cover()
+        col.uncover()
+    return call
+
+def setup_genLinkList(size: int, seed: int):
+    import AlgX
+    s, _ = make_board(size, seed)
+    return lambda: AlgX.genLinkList(s)
+
+def _annealer(size: int, seed: int):
+    import SimAl
+    s, _ = make_board(size, seed)
+    random.seed(seed)
+    return SimAl.SimulatedAnnealing(s)
+
+def setup_compute_delta_errors(size: int, seed: int):
+    sa = _annealer(size, seed)
+    rng = random.Random(seed)
+    pairs = []
+    n = sa.n
+    while len(pairs) < 1024:
+        br, bc = rng.randrange(n), rng.randrange(n)
+        cells = [(r, c) for r in range(br*n, (br+1)*n) for c in range(bc*n, (bc+1)*n) if not sa.fixed[r, c]]
+        if len(cells) >= 2:
+            (r1, c1), (r2, c2) = rng.sample(cells, 2)
+            pairs.append((r1, c1, r2, c2))
+    state = {"i": 0}
+    def call():
+        p = pairs[state["i"] & 1023]
+        state["i"] += 1
+        return sa.compute_delta_errors(*p)
+    return call
+
+def setup_get_conflict_cells(size: int, seed: int):
+    sa = _annealer(size, seed)
+    return sa.get_conflict_cells
+
+def setup_select_vertex(size: int, seed: int):
+    from GraphBased.dSaturSolver import select_vertex
+    s, _ = make_board(size, seed)
+    N = s.length
+    colors = {r * N + c: s.board[r][c] for r in range(N) for c in range(N) if s.fixed[r][c]}
+    return lambda: select_vertex(colors, N * N, N, size)
+
+PRIMITIVES = {
+    "isValid": setup_isValid,
+    "cover_uncover": setup_cover_uncover,
+    "genLinkList": setup_genLinkList,
+    "compute_delta_errors": setup_compute_delta_errors,
+    "get_conflict_cells": setup_get_conflict_cells,
+    "select_vertex": setup_select_vertex,
+}
+
+def time_calls(fn, min_time: float, max_calls: int) -> tuple[int, float]:
+    '''Calls fn in growing batches until min_time seconds or max_calls are spent.'''
+    calls, elapsed, batch = 0, 0.0, 1
+    while elapsed < min_time and calls < max_calls:
+        batch = min(batch, max_calls - calls)
+        t0 = time.perf_counter()
+        for _ in range(batch):
+            fn()
+        elapsed += time.perf_counter() - t0
+        calls += batch
+        batch *= 2
+    return calls, elapsed
+
+def measure_allocations(fn, calls: int) -> tuple[float, float]:
+    '''
+    Returns (retained blocks per call, mean peak bytes per call). A call's peak is its
+    high-water mark above the traced memory it started with, so short-lived temporaries
+    count there. Retained blocks are those still alive after the calls and a gc.collect(),
+    i.e. what a call leaves behind (caches, leaks), not how many allocations it makes.
+    '''
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    peaks = 0
+    for _ in range(calls):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        peaks += tracemalloc.get_traced_memory()[1] - base
+    gc.collect() # uncollected cycles (AlgX nodes) are not retained, and would move with GC timing
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+    before, after = before.filter_traces(ignore), after.filter_traces(ignore)
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return blocks / calls, peaks / calls
+
+def bench(name: str, size: int, seed: int, min_time: float, max_calls: int, alloc_calls: int) -> dict:
+    fn = PRIMITIVES[name](size, seed)
+    fn() # warm up
+    calls, elapsed = time_calls(fn, min_time, max_calls)
+    blocks, peak = measure_allocations(fn, max(1, min(alloc_calls, calls)))
+    return {
+        "primitive": name,
+        "size": size,
+        "seed": seed,
+        "calls": calls,
+        "per_call": elapsed / calls,
+        "calls_per_sec": calls / elapsed if elapsed > 0 else float("inf"),
+        "retained_blocks_per_call": blocks,
+        "peak_bytes_per_call": peak,
+    }
+
+def _key(entry: dict) -> str:
+    return f"{entry['primitive']}/{entry['size']}"
+
+def print_results(results: list[dict], baseline: dict[str, dict] | None = None) -> None:
+    for r in results:
+        line = (f"{r['primitive']:<22} n={r['size']} | {r['per_call']*1e6:12.2f} us/call | "
+                f"{r['calls_per_sec']:12.1f} calls/s | {r['retained_blocks_per_call']:8.1f} retained | "
+                f"{r['peak_bytes_per_call']:10.0f} B peak")
+        old = baseline.get(_key(r)) if baseline else None
+        if old:
+            line += f" | {old['per_call'] / r['per_call']:5.2f}x vs baseline"
+        print(line)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark solver primitives in isolation.")
+    parser.add_argument("--only", nargs="+", choices=list(PRIMITIVES), help="primitives to run (default: all)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES))
+    parser.add_argument("--seed", type=int, default=14)
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to spend timing each primitive")
+    parser.add_argument("--max-calls", type=int, default=1_000_000)
+    parser.add_argument("--alloc-calls", type=int, default=100, help="calls made under tracemalloc")
+    parser.add_argument("--save", help="write results to this JSON baseline file")
+    parser.add_argument("--baseline", help="compare against a saved baseline file")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {_key(e): e for e in json.load(f)["results"]}
+
+    results = []
+    for name in args.only or PRIMITIVES:
+        for size in args.sizes:
+            results.append(bench(name, size, args.seed, args.min_time, args.max_calls, args.alloc_calls))
+            print_results(results[-1:], baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": sys.version, "results": results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+'''
+Feature-based solver selection and racing portfolio.
+
+solve_auto(sudoku) extracts cheap features (size, clue count, candidate-count
+histogram after naked-single propagation, unit fill ratios), looks the puzzle's
+bucket up in a policy table and runs the best solver, or races the top two in
+separate processes under one shared deadline.
+
+The policy is learned from Dataloader_II result files:
+
+    python portfolio.py train results.jsonl --out policy.json
+'''
+
+import argparse, json, multiprocessing, os, queue, sys, time
+from Sudoku import Sudoku
+import solve_api
+from bench_results import read_results, percentile
+
+DEFAULT_POLICY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "policy.json")
+# Used when no trained policy covers the puzzle
+BUILTIN_RANKING = ["algx", "dsatur", "simanneal", "backtracking"]
+CLUE_BUCKET = 0.1
+PROP_BUCKET = 0.25
+RACE_POLL = 0.1 # seconds between checks for racers that died without a result
+
+_peer_cache: dict[int, list[list[int]]] = {}
+
+def _peers(size: int) -> list[list[int]]:
+    '''peers[i]: flat indices sharing a row, column or box with cell i.'''
+    if size not in _peer_cache:
+        N = size * size
+        peers = []
+        for i in range(N * N):
+            r, c = divmod(i, N)
+            br, bc = r - r % size, c - c % size
+            p = {r * N + k for k in range(N)} | {k * N + c for k in range(N)}
+            p |= {(br + a) * N + bc + b for a in range(size) for b in range(size)}
+            p.discard(i)
+            peers.append(sorted(p))
+        _peer_cache[size] = peers
+    return _peer_cache[size]
+
+def propagate(s: Sudoku) -> list[int]:
+    '''Candidate bitmasks (bit d-1 = digit d) after naked-single elimination to a fixpoint.'''
+    N = s.length
+    full = (1 << N) - 1
+    cands = [full] * (N * N)
+    pending = []
+    for r in range(N):
+        for c in range(N):
+            if s.fixed[r][c] and s.board[r][c]:
+                cands[r * N + c] = 1 << (s.board[r][c] - 1)
+                pending.append(r * N + c)
+    peers = _peers(s.size)
+    done = [False] * (N * N)
+    while pending:
+        i = pending.pop()
+        if done[i]:
+            continue
+        done[i] = True
+        bit = cands[i]
+        for j in peers[i]:
+            m = cands[j]
+            if m & bit:
+                m &= ~bit
+                cands[j] = m
+                if m and not (m & (m - 1)):
+                    pending.append(j)
+    return cands
+
+def extract_features(s: Sudoku) -> dict:
+    N, n = s.length, s.size
+    cells = N * N
+    clues = sum(1 for row in s.fixed for f in row if f)
+    cands = propagate(s)
+    hist = [0] * (N + 1) # hist[k]: cells with k candidates left
+    for m in cands:
+        hist[bin(m).count("1")] += 1
+    fills = []
+    for k in range(N):
+        fills.append(sum(1 for c in range(N) if s.fixed[k][c]) / N)
+        fills.append(sum(1 for r in range(N) if s.fixed[r][k]) / N)
+        br, bc = (k // n) * n, (k % n) * n
+        fills.append(sum(1 for a in range(n) for b in range(n) if s.fixed[br + a][bc + b]) / N)
+    return {
+        "size": n,
+        "clues": clues,
+        "clue_ratio": clues / cells,
+        "cand_hist": hist,
+        "propagated_ratio": (hist[1] - clues) / max(1, cells - clues),
+        "contradiction": hist[0] > 0,
+        "fill_min": min(fills),
+        "fill_mean": sum(fills) / len(fills),
+        "fill_max": max(fills),
+    }
+
+def _bucket(value: float, width: float) -> str:
+    return f"{int(value / width) * width:.2f}"
+
+def bucket_keys(size: int, clue_ratio: float, propagated_ratio: float | None = None) -> list[str]:
+    '''Policy keys from most to least specific.'''
+    clue = _bucket(clue_ratio, CLUE_BUCKET)
+    keys = [f"{size}/{clue}", str(size)]
+    if propagated_ratio is not None:
+        keys.insert(0, f"{size}/{clue}/{_bucket(propagated_ratio, PROP_BUCKET)}")
+    return keys
+
+class Policy:
+    def __init__(self, table: dict[str, list[str]] | None = None):
+        self.table = table or {}
+
+    def rank(self, feat: dict) -> list[str]:
+        for key in bucket_keys(feat["size"], feat["clue_ratio"], feat["propagated_ratio"]):
+            if key in self.table:
+                return self.table[key]
+        return BUILTIN_RANKING
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_POLICY_PATH) -> "Policy":
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            return cls(json.load(f)["table"])
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({"table": self.table}, f, indent=2, sort_keys=True)
+
+def _row_features(rows: list[dict]) -> dict[tuple[str, int], dict]:
+    '''Recomputes features for every (file, index) in the results whose puzzle file is readable.'''
+    from Dataloader_II import iter_puzzles
+    wanted: dict[str, tuple[int, int]] = {}
+    for row in rows:
+        size, top = wanted.get(row["file"], (row["size"], -1))
+        wanted[row["file"]] = (size, max(top, row["index"]))
+    feats = {}
+    for fname, (size, top) in wanted.items():
+        if not os.path.exists(fname):
+            continue
+        for idx, s in iter_puzzles(fname, size, top + 1):
+            feats[(fname, idx)] = extract_features(s)
+    return feats
+
+def train(rows: list[dict], min_samples: int = 5) -> Policy:
+    '''
+    Ranks solvers per bucket by expected cost: p50 wall time of solved runs plus, for the
+    unsolved fraction, a penalty of the slowest time seen in the bucket.
+    '''
+    feats = _row_features(rows)
+    groups: dict[str, dict[str, list[dict]]] = {}
+    for row in rows:
+        feat = feats.get((row["file"], row["index"]))
+        # without the puzzle file, bucket by size and clue density only
+        prop = feat["propagated_ratio"] if feat else None
+        for key in bucket_keys(row["size"], row["clues"] / row["size"] ** 4, prop):
+            groups.setdefault(key, {}).setdefault(row["solver"], []).append(row)
+
+    table = {}
+    for key, by_solver in groups.items():
+        worst = max(r["wall_time"] for group in by_solver.values() for r in group)
+        scores = []
+        for solver, group in by_solver.items():
+            if len(group) < min_samples:
+                continue
+            solved = sorted(r["wall_time"] for r in group if r["solved"])
+            rate = len(solved) / len(group)
+            p50 = percentile(solved, 50) if solved else worst
+            scores.append((rate * p50 + (1 - rate) * worst, solver))
+        if scores:
+            table[key] = [solver for _, solver in sorted(scores)]
+    return Policy(table)
+
+def _race_worker(name: str, size: int, board, fixed, timeout, cancel_event, results) -> None:
+    # always post a result, so race() is not left waiting on a racer that raised
+    try:
+        s = Sudoku(size)
+        s.board, s.fixed = board, fixed
+        res = solve_api.solve(s, name, timeout=timeout, token=solve_api.CancelToken(cancel_event))
+        results.put((name, res.status, res.elapsed, res.stats, s.board))
+    except Exception as e:
+        results.put((name, solve_api.FAILED, 0.0, {"error": str(e)}, None))
+
+def race(s: Sudoku, solvers: list[str], timeout: float | None = None) -> tuple[str, solve_api.SolveResult]:
+    '''
+    Runs the solvers in parallel processes; the first to solve wins and the rest are cancelled.
+    A racer that raised or died without posting a result counts as FAILED with stats["error"].
+    '''
+    start = time.monotonic()
+    ctx = multiprocessing.get_context()
+    cancel = ctx.Event()
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_race_worker, args=(name, s.size, s.board, s.fixed, timeout, cancel, results),
+                         daemon=True) for name in solvers]
+    for p in procs:
+        p.start()
+    pending = dict(zip(solvers, procs))
+    stop = None if timeout is None else start + timeout + 1.0
+    winner, final = solvers[0], None
+    try:
+        while pending:
+            # a racer's result is in the pipe before its process exits, so one found dead
+            # here whose result is still not in the queue never posted it
+            dead = [name for name, p in pending.items() if not p.is_alive()]
+            wait = RACE_POLL if stop is None else min(RACE_POLL, stop - time.monotonic())
+            if wait <= 0:
+                break
+            try:
+                name, status, elapsed, stats, board = results.get(timeout=wait)
+            except queue.Empty:
+                for name in dead:
+                    p = pending.pop(name)
+                    if final is None:
+                        winner, final = name, (solve_api.FAILED, {"error": f"exit code {p.exitcode}"}, None)
+                continue
+            pending.pop(name, None)
+            # a real result (SOLVED first) beats one from a racer that errored
+            if final is None or status == solve_api.SOLVED or ("error" in final[1] and "error" not in stats):
+                winner, final = name, (status, stats, board)
+            if status == solve_api.SOLVED:
+                break
+    finally:
+        cancel.set()
+        for p in procs:
+            p.join(1.0)
+            if p.is_alive():
+                p.terminate()
+    if final is None:
+        return winner, solve_api.SolveResult(solve_api.TIMEOUT, time.monotonic() - start, {})
+    status, stats, board = final
+    if status == solve_api.SOLVED:
+        s.board = board
+    return winner, solve_api.SolveResult(status, time.monotonic() - start, stats)
+
+def solve_auto(s: Sudoku, timeout: float | None = None, race_top: int = 1,
+               policy: Policy | None = None) -> solve_api.SolveResult:
+    '''
+    Picks a solver for `s` from the policy and solves it in place. With race_top > 1 the top
+    candidates race in separate processes under the shared timeout.
+    stats["solver"] names the solver that produced the result, stats["features"] the features used.
+    '''
+    if policy is None:
+        policy = Policy.load()
+    feat = extract_features(s)
+    ranking = [name for name in policy.rank(feat) if name in solve_api.SOLVERS] or BUILTIN_RANKING
+    if race_top > 1:
+        winner, res = race(s, ranking[:race_top], timeout)
+    else:
+        winner, res = ranking[0], solve_api.solve(s, ranking[0], timeout=timeout)
+    res.stats["solver"] = winner
+    res.stats["features"] = feat
+    return res
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Train or inspect the solver selection policy.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_train = sub.add_parser("train", help="learn a policy from result files")
+    p_train.add_argument("results", nargs="+")
+    p_train.add_argument("--out", default=DEFAULT_POLICY_PATH)
+    p_train.add_argument("--min-samples", type=int, default=5)
+    p_show = sub.add_parser("show", help="print a policy table")
+    p_show.add_argument("policy", nargs="?", default=DEFAULT_POLICY_PATH)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "train":
+        rows = [row for path in args.results for row in read_results(path)]
+        policy = train(rows, args.min_samples)
+        policy.save(args.out)
+        print(f"Wrote {len(policy.table)} buckets to {args.out}")
+    else:
+        for key, ranking in sorted(Policy.load(args.policy).table.items()):
+            print(f"{key:<16} {' > '.join(ranking)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
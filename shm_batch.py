@@ -0,0 +1,205 @@
+'''
+Shared-memory batch transport for solving on worker processes.
+
+Handing Sudoku objects to a process pool pickles two N x N lists of Python ints per
+puzzle on the way out and the solved board on the way back; on 25x25 boards that costs
+about as much as solving the easy ones. Here a whole batch lives in one
+multiprocessing.shared_memory segment:
+
+    elapsed    float64 x B       seconds per solve
+    status     int8    x B       index into STATUSES (0 = not run yet)
+    puzzles    uint8   x B*N*N   clues, row major, 0 = empty (uint16 when N > 255)
+    solutions  uint8   x B*N*N   boards as the solver left them
+
+Workers get only (segment name, size, count, start, stop, solver, timeout), read their
+puzzles and write solutions, status and time in place through memoryview casts
+(Sudoku.fillFromValues / writeValues), so no board goes through a pipe and the workers
+do not need NumPy. Solver stats (nodes, iterations, ...) do not come back, only status
+and time.
+
+    with make_pool(4) as pool:
+        results = solve_shared(puzzles, "algx", pool=pool)   # list of solve_api.SolveResult
+
+`python shm_batch.py --file size5.csv` compares this with pickling the puzzles.
+'''
+
+import argparse, math, os, signal, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from Sudoku import Sudoku
+import solve_api
+
+PENDING = "pending"
+ERROR = "error"
+STATUSES = (PENDING, solve_api.SOLVED, solve_api.UNSAT, solve_api.TIMEOUT, solve_api.CANCELLED,
+            solve_api.FAILED, ERROR)
+_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+class BatchBuffer:
+    '''Typed views over one segment. The parent create()s and unlinks it, workers attach().'''
+    def __init__(self, shm: shared_memory.SharedMemory, size: int, count: int, owner: bool):
+        self.shm = shm
+        self.size = size
+        self.count = count
+        self.owner = owner
+        self.cells = size ** 4
+        fmt, item = _cell_format(size)
+        a = 8 * count # float64 first keeps it aligned
+        b = a + count
+        c = b + self.cells * count * item
+        d = c + self.cells * count * item
+        buf = shm.buf
+        self.elapsed = buf[:a].cast('d')
+        self.status = buf[a:b].cast('b')
+        self.puzzles = buf[b:c].cast(fmt)
+        self.solutions = buf[c:d].cast(fmt)
+
+    @staticmethod
+    def nbytes(size: int, count: int) -> int:
+        return count * (9 + 2 * size ** 4 * _cell_format(size)[1])
+
+    @classmethod
+    def create(cls, size: int, count: int) -> "BatchBuffer":
+        shm = shared_memory.SharedMemory(create=True, size=max(1, cls.nbytes(size, count)))
+        return cls(shm, size, count, True)
+
+    @classmethod
+    def attach(cls, name: str, size: int, count: int) -> "BatchBuffer":
+        return cls(shared_memory.SharedMemory(name=name), size, count, False)
+
+    def close(self) -> None:
+        for view in (self.elapsed, self.status, self.puzzles, self.solutions):
+            view.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _cell_format(size: int) -> tuple[str, int]:
+    return ('B', 1) if size * size < 256 else ('H', 2)
+
+def _ignore_sigint():
+    # Ctrl-C goes to the whole process group; only the parent decides how to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def make_pool(workers: int | None = None) -> ProcessPoolExecutor:
+    '''
+    Pool for solve_shared. The resource tracker is started first so the workers share it
+    with the parent; otherwise each worker starts its own, which "cleans up" (unlinks)
+    every segment it attached when the worker exits.
+    '''
+    resource_tracker.ensure_running()
+    return ProcessPoolExecutor(workers, initializer=_ignore_sigint)
+
+def _solve_range(name: str, size: int, count: int, start: int, stop: int, solver: str,
+                 timeout: float | None) -> int:
+    '''Worker side: solves puzzles start..stop-1 of the segment in place. Returns how many.'''
+    buf = BatchBuffer.attach(name, size, count)
+    try:
+        for i in range(start, stop):
+            s = Sudoku(size)
+            s.fillFromValues(buf.puzzles, i * buf.cells)
+            try:
+                res = solve_api.solve(s, solver, timeout=timeout)
+                code, elapsed = _CODES[res.status], res.elapsed
+            except Exception:
+                code, elapsed = _CODES[ERROR], 0.0
+            s.writeValues(buf.solutions, i * buf.cells)
+            buf.elapsed[i] = elapsed
+            buf.status[i] = code
+    finally:
+        buf.close()
+    return stop - start
+
+def solve_shared(puzzles: list[Sudoku], solver: str = "algx", workers: int | None = None,
+                 timeout: float | None = None, pool: ProcessPoolExecutor | None = None,
+                 chunks_per_worker: int = 4, write_back: bool = True) -> list[solve_api.SolveResult]:
+    '''
+    Solves puzzles (all the same size) on a process pool, writing solved boards back into
+    them unless write_back is False (benchmarks only want status and time). Each worker
+    call covers a contiguous range, about chunks_per_worker ranges per worker so uneven
+    solve times still balance. Without a pool, one is started for the call; a pool passed
+    in should come from make_pool().
+    '''
+    if not puzzles:
+        return []
+    size = puzzles[0].size
+    workers = workers or getattr(pool, "_max_workers", None) or os.cpu_count() or 1
+    step = max(1, math.ceil(len(puzzles) / (workers * chunks_per_worker)))
+    own = pool is None
+    if own:
+        pool = make_pool(workers)
+    try:
+        with BatchBuffer.create(size, len(puzzles)) as buf:
+            for i, s in enumerate(puzzles):
+                s.writeValues(buf.puzzles, i * buf.cells)
+            futures = [pool.submit(_solve_range, buf.shm.name, size, len(puzzles), start,
+                                   min(start + step, len(puzzles)), solver, timeout)
+                       for start in range(0, len(puzzles), step)]
+            for f in futures:
+                f.result()
+            N = size * size
+            results = []
+            for i, s in enumerate(puzzles):
+                status = STATUSES[buf.status[i]]
+                if write_back and status == solve_api.SOLVED:
+                    base = i * buf.cells
+                    s.board = [buf.solutions[base + r * N:base + (r + 1) * N].tolist() for r in range(N)]
+                results.append(solve_api.SolveResult(status, buf.elapsed[i], {"transport": "shm"}))
+            return results
+    finally:
+        if own:
+            pool.shutdown()
+
+def _solve_pickled(puzzles: list[Sudoku], solver: str, timeout: float | None) -> list[tuple[Sudoku, str, float]]:
+    '''Baseline for main(): Sudoku objects pickled to the worker and back.'''
+    out = []
+    for s in puzzles:
+        res = solve_api.solve(s, solver, timeout=timeout)
+        out.append((s, res.status, res.elapsed))
+    return out
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare pickled and shared-memory dispatch to a process pool.")
+    parser.add_argument("--file", default="size5.csv")
+    parser.add_argument("--size", type=int, help="box size (default: from the file name)")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--solver", default="algx")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--timeout", type=float)
+    args = parser.parse_args(argv)
+
+    import Dataloader_II
+    size = args.size or Dataloader_II.FILES[os.path.basename(args.file)]
+    puzzles, _ = Dataloader_II.load_puzzles(args.file, size, args.limit)
+    step = max(1, math.ceil(len(puzzles) / (args.workers * 4)))
+
+    def pickled(batch):
+        futures = [pool.submit(_solve_pickled, batch[i:i + step], args.solver, args.timeout)
+                   for i in range(0, len(batch), step)]
+        return [elapsed for f in futures for _, _, elapsed in f.result()]
+
+    def shared(batch):
+        return [res.elapsed for res in solve_shared(batch, args.solver, timeout=args.timeout, pool=pool)]
+
+    # parent CPU is the part that does not spread over the workers: pickling the puzzles and
+    # unpickling the results, or writing the segment and copying the solutions back
+    with make_pool(args.workers) as pool:
+        # start the workers and load the solver (and any compiled kernels) before timing
+        pool.submit(_solve_pickled, [Dataloader_II._clone_sudoku(puzzles[0])], args.solver, None).result()
+        for label, run in (("pickle", pickled), ("shm", shared)):
+            batch = [Dataloader_II._clone_sudoku(s) for s in puzzles]
+            wall, cpu = time.perf_counter(), time.process_time()
+            solve = sum(run(batch))
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            print(f"{label:>6}: {wall:.3f}s wall for {len(batch)} puzzles ({solve:.3f}s solving), "
+                  f"parent CPU {cpu / len(batch) * 1e6:.0f}us per puzzle")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
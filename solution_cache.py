@@ -0,0 +1,112 @@
+'''
+Solution cache keyed by canonical form (see canonical.py).
+
+Two tiers: an in-memory LRU and an optional persistent SQLite file. Solutions
+are stored in canonical coordinates, so any puzzle equivalent to a cached one
+(up to band/stack/row/column permutation, transposition and relabeling) is
+answered by mapping the stored solution back through the inverse transform.
+
+    cache = SolutionCache("solutions.db")
+    res = cache.solve(puzzle, "algx")   # solve_api.SolveResult, stats["cache"] says where it came from
+'''
+
+import sqlite3, time
+from collections import OrderedDict
+from Sudoku import Sudoku
+from canonical import canonicalize, Transform
+import solve_api
+
+DEFAULT_CAPACITY = 4096
+
+def _encode(grid: list[list[int]]) -> str:
+    return ",".join(str(v) for row in grid for v in row)
+
+def _decode(text: str, N: int) -> list[list[int]]:
+    vals = [int(v) for v in text.split(",")]
+    return [vals[r*N:(r+1)*N] for r in range(N)]
+
+def _matches_clues(s: Sudoku, grid: list[list[int]]) -> bool:
+    return all(grid[r][c] == s.board[r][c]
+               for r in range(s.length) for c in range(s.length) if s.fixed[r][c])
+
+class SolutionCache:
+    def __init__(self, path: str | None = None, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._lru: OrderedDict[str, str] = OrderedDict()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path)
+            self._db.execute("CREATE TABLE IF NOT EXISTS solutions "
+                             "(key TEXT PRIMARY KEY, size INTEGER NOT NULL, solution TEXT NOT NULL)")
+            self._db.commit()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+    def _remember(self, key: str, solution: str) -> None:
+        self._lru[key] = solution
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.capacity:
+            self._lru.popitem(last=False)
+
+    def _lookup(self, key: str) -> tuple[str | None, str | None]:
+        if key in self._lru:
+            self._lru.move_to_end(key)
+            return self._lru[key], "memory"
+        if self._db is not None:
+            row = self._db.execute("SELECT solution FROM solutions WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._remember(key, row[0])
+                return row[0], "disk"
+        return None, None
+
+    def _get(self, s: Sudoku, canon: tuple[str, Transform]) -> tuple[list[list[int]] | None, str | None]:
+        key, transform = canon
+        stored, tier = self._lookup(key)
+        if stored is None:
+            self.misses += 1
+            return None, None
+        grid = transform.invert(_decode(stored, s.length))
+        if not _matches_clues(s, grid):
+            self.misses += 1
+            return None, None
+        self.hits[tier] += 1
+        return grid, tier
+
+    def get(self, s: Sudoku, canon: tuple[str, Transform] | None = None) -> list[list[int]] | None:
+        '''Solved board for `s` in its own coordinates, or None on a miss.'''
+        return self._get(s, canon or canonicalize(s))[0]
+
+    def put(self, s: Sudoku, solution: list[list[int]], canon: tuple[str, Transform] | None = None) -> None:
+        '''Stores a solved board for puzzle `s` (clues taken from s.fixed).'''
+        key, transform = canon or canonicalize(s)
+        stored = _encode(transform.apply(solution))
+        self._remember(key, stored)
+        if self._db is not None:
+            self._db.execute("INSERT OR REPLACE INTO solutions (key, size, solution) VALUES (?, ?, ?)",
+                             (key, s.size, stored))
+            self._db.commit()
+
+    def solve(self, s: Sudoku, solver: str = "algx", **solve_opts) -> solve_api.SolveResult:
+        '''Answers from the cache when possible, otherwise solves with solve_api and stores the result.'''
+        start = time.monotonic()
+        canon = canonicalize(s)
+        grid, tier = self._get(s, canon)
+        if grid is not None:
+            s.board = grid
+            return solve_api.SolveResult(solve_api.SOLVED, time.monotonic() - start, {"cache": tier})
+        res = solve_api.solve(s, solver, **solve_opts)
+        if res.solved:
+            self.put(s, s.board, canon)
+        res.stats["cache"] = "miss"
+        return res
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,139 @@
+'''
+Early-stopping solution counter for uniqueness checks.
+
+Bitmask backtracking with minimum-remaining-values cell choice; when no cell is down
+to one candidate, a value with one place left in a row, column or box (hidden single)
+is placed instead, and a unit with a missing value that fits nowhere fails. Counting stops
+as soon as `limit` solutions are found (limit=2 answers "is it unique?"), and
+an optional node budget bounds the work on hard boards.
+'''
+
+import sys
+
+class SearchLimit(Exception):
+    pass
+
+def count_solutions(grid: list[int], size: int, limit: int = 2, max_nodes: int | None = None,
+                    forbid: tuple[int, int] | None = None) -> int | None:
+    '''
+    grid: flat row-major list of N*N ints, 0 = empty. Returns the number of solutions found,
+    capped at `limit`, or None if max_nodes ran out first. Clashing clues give 0.
+    forbid=(cell, value) excludes one value from one empty cell.
+    '''
+    N = size * size
+    full = (1 << N) - 1
+    forbid_cell, forbid_bit = (forbid[0], 1 << (forbid[1] - 1)) if forbid else (-1, 0)
+    rows, cols, boxes = [0] * N, [0] * N, [0] * N
+    box_of = [(i // N) // size * size + (i % N) // size for i in range(N * N)]
+    empties = []
+    for i, v in enumerate(grid):
+        if not v:
+            empties.append(i)
+            continue
+        bit = 1 << (v - 1)
+        r, c, b = i // N, i % N, box_of[i]
+        if (rows[r] | cols[c] | boxes[b]) & bit:
+            return 0
+        rows[r] |= bit
+        cols[c] |= bit
+        boxes[b] |= bit
+
+    found = 0
+    nodes = 0
+    cell_r = [i // N for i in range(N * N)]
+    cell_c = [i % N for i in range(N * N)]
+
+    def hidden_single(k: int, masks: list[int]) -> tuple[int, int] | None:
+        # masks[j] is the candidate mask of empties[k + j]. Returns (slot, bit) for a value with
+        # one place left in some unit, (-1, 0) when a unit has a missing value with no place
+        # at all, None when neither
+        units = (rows, cell_r), (cols, cell_c), (boxes, box_of)
+        for placed, unit_of in units:
+            once, twice = [0] * N, [0] * N
+            for j, m in enumerate(masks):
+                u = unit_of[empties[k + j]]
+                twice[u] |= once[u] & m
+                once[u] |= m
+            for u in range(N):
+                need = full & ~placed[u]
+                if once[u] & need != need:
+                    return -1, 0
+                single = need & ~twice[u]
+                if single:
+                    bit = single & -single
+                    for j, m in enumerate(masks):
+                        if m & bit and unit_of[empties[k + j]] == u:
+                            return k + j, bit
+        return None
+
+    def search(k: int) -> None:
+        # empties[:k] are filled; pick the open cell with fewest candidates and move it to slot k
+        nonlocal found, nodes
+        if k == len(empties):
+            found += 1
+            return
+        best_j, best_mask, best_cnt = k, 0, N + 1
+        masks = []
+        for j in range(k, len(empties)):
+            i = empties[j]
+            mask = full & ~(rows[cell_r[i]] | cols[cell_c[i]] | boxes[box_of[i]])
+            if i == forbid_cell:
+                mask &= ~forbid_bit
+            masks.append(mask)
+            cnt = mask.bit_count()
+            if cnt < best_cnt:
+                best_j, best_mask, best_cnt = j, mask, cnt
+                if cnt <= 1:
+                    break
+        if best_cnt == 0:
+            return
+        if best_cnt > 1:
+            # no naked single: a value with one place left in a row, column or box is forced too
+            hidden = hidden_single(k, masks)
+            if hidden is not None:
+                if hidden[0] < 0:
+                    return
+                best_j, best_mask = hidden
+            else:
+                # only real branch points count against the budget; forced placements are cheap
+                nodes += 1
+                if max_nodes is not None and nodes > max_nodes:
+                    raise SearchLimit()
+        empties[k], empties[best_j] = empties[best_j], empties[k]
+        i = empties[k]
+        r, c, b = cell_r[i], cell_c[i], box_of[i]
+        mask = best_mask
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            rows[r] |= bit
+            cols[c] |= bit
+            boxes[b] |= bit
+            search(k + 1)
+            rows[r] ^= bit
+            cols[c] ^= bit
+            boxes[b] ^= bit
+            if found >= limit:
+                break
+        empties[k], empties[best_j] = empties[best_j], empties[k]
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), len(empties) + 100))
+    try:
+        search(0)
+    except SearchLimit:
+        return None
+    return min(found, limit)
+
+def has_other_solution(grid: list[int], size: int, cell: int, value: int,
+                       max_nodes: int | None = None) -> bool | None:
+    '''
+    Given that the grid has a solution with `value` at empty `cell`, is there one without it?
+    This is the uniqueness test for digging out a single clue, and it skips the known branch.
+    '''
+    n = count_solutions(grid, size, 1, max_nodes, (cell, value))
+    return None if n is None else n > 0
+
+def is_unique(grid: list[int], size: int, max_nodes: int | None = None) -> bool | None:
+    '''True/False, or None when the node budget ran out.'''
+    n = count_solutions(grid, size, 2, max_nodes)
+    return None if n is None else n == 1
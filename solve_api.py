@@ -0,0 +1,238 @@
+'''
+Common solve interface with cooperative deadlines and cancellation.
+
+Every solver takes an optional SolveControl and calls control.tick() once per
+search node / step / iteration. The control only looks at the clock and the
+cancel token every `check_every` ticks, so the cost in the hot loop is one
+counter increment. When the deadline passes or the token is cancelled, tick()
+raises SolveInterrupted, which solve() turns into a TIMEOUT/CANCELLED result.
+
+    res = solve(puzzle, "algx", timeout=0.5)
+    if res.status == SOLVED: ...
+
+Solvers are looked up by name in SOLVERS. Engine modules (AlgX, SimAl and its NumPy,
+...) are only imported when a solver is first used, so importing this module is cheap.
+'''
+
+import importlib, threading, time
+from Sudoku import Sudoku
+
+SOLVED = "solved"
+UNSAT = "unsat"           # search space exhausted, no solution exists
+TIMEOUT = "timeout"
+CANCELLED = "cancelled"
+FAILED = "failed"         # incomplete solver gave up (step/iteration cap) without a proof
+
+DEFAULT_CHECK_EVERY = 256
+# Per-solver tick cost differs a lot: a DSatur step rescans the whole graph and a backtracking
+# step runs a full-board isValid, which is slow on large boards
+CHECK_EVERY = {"dsatur": 1, "backtracking": 16,
+               "algx_jit": 4096, "simanneal_jit": 4096} # compiled kernels run this many steps per call
+
+class CancelToken:
+    '''
+    Thread-safe cancellation flag. Any object with is_set() (threading.Event,
+    multiprocessing.Event) can be wrapped so the token works across processes.
+    '''
+    def __init__(self, event=None):
+        self._event = event if event is not None else threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+class SolveInterrupted(Exception):
+    def __init__(self, status: str):
+        super().__init__(status)
+        self.status = status
+
+class SolveControl:
+    '''
+    Deadline (time.monotonic() seconds) and/or cancel token, checked every check_every ticks.
+    Solvers that can resume set `snapshot` to a function returning their in-flight state as
+    a JSON-serializable dict; with a `checkpoint` callback the control passes it a snapshot
+    at most every checkpoint_interval seconds.
+    '''
+    def __init__(self, deadline: float | None = None, token: CancelToken | None = None,
+                 check_every: int = DEFAULT_CHECK_EVERY, checkpoint=None, checkpoint_interval: float = 60.0):
+        self.deadline = deadline
+        self.token = token
+        self.check_every = max(1, check_every)
+        self.ticks = 0
+        self._next_check = self.check_every
+        self.snapshot = None
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self._next_checkpoint = time.monotonic() + checkpoint_interval
+
+    def tick(self, n: int = 1) -> None:
+        self.ticks += n
+        if self.ticks >= self._next_check:
+            self._next_check = self.ticks + self.check_every
+            self.check()
+
+    def check(self) -> None:
+        if self.token is not None and self.token.is_cancelled():
+            raise SolveInterrupted(CANCELLED)
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise SolveInterrupted(TIMEOUT)
+        if self.checkpoint is not None and self.snapshot is not None:
+            now = time.monotonic()
+            if now >= self._next_checkpoint:
+                self._next_checkpoint = now + self.checkpoint_interval
+                self.checkpoint(self.snapshot())
+
+class SolveResult:
+    '''`resume` holds the solver's in-flight state when a resumable solve was interrupted.'''
+    def __init__(self, status: str, elapsed: float, stats: dict, resume: dict | None = None):
+        self.status = status
+        self.elapsed = elapsed
+        self.stats = stats
+        self.resume = resume
+
+    @property
+    def solved(self) -> bool:
+        return self.status == SOLVED
+
+    def __repr__(self):
+        return f"SolveResult(status={self.status!r}, elapsed={self.elapsed:.4f}, stats={self.stats!r})"
+
+# Adapters: solve `s` in place, fill `stats` and return a status. They may raise SolveInterrupted,
+# in which case `stats` must already hold whatever partial counters are available. Resumable
+# adapters take a `resume` dict (an earlier snapshot) and set control.snapshot.
+
+def _solve_algx(s: Sudoku, control: SolveControl, stats: dict, resume: dict | None = None, **opts) -> str:
+    import AlgX
+    ops, cov, unc = AlgX.operations, AlgX.covers, AlgX.uncovers
+    stack = [tuple(rowId) for rowId in resume["stack"]] if resume else []
+    control.snapshot = lambda: {"solver": "algx", "stack": [list(rowId) for rowId in stack]}
+    try:
+        ok = AlgX.run(s, control, stack)
+    finally:
+        stats["operations"] = AlgX.operations - ops
+        stats["covers"] = AlgX.covers - cov
+        stats["uncovers"] = AlgX.uncovers - unc
+    return SOLVED if ok else UNSAT
+
+def _solve_dsatur(s: Sudoku, control: SolveControl, stats: dict, max_steps: int | None = 1000, **opts) -> str:
+    from GraphBased.dSaturSolver import solve_sudoku_dsatur
+    ok, steps = solve_sudoku_dsatur(s, control, max_steps)
+    stats["steps"] = steps
+    if ok and s.isComplete():
+        return SOLVED
+    if max_steps is not None and steps >= max_steps:
+        return FAILED
+    return UNSAT
+
+def _solve_simanneal(s: Sudoku, control: SolveControl, stats: dict, max_iters: int = 8*(10**6),
+                     resume: dict | None = None, **opts) -> str:
+    import SimAl
+    solver = SimAl.SimulatedAnnealing(s, **opts)
+    if resume:
+        solver.load_state_dict(resume["state"])
+    control.snapshot = lambda: {"solver": "simanneal", "state": solver.state_dict()}
+    try:
+        solver.solve(display=False, max_iters=max_iters, control=control)
+    finally:
+        stats["iters"] = solver.iters
+        stats["reheats"] = solver.reheats
+        stats["errors"] = int(solver.error_count)
+    return SOLVED if s.isComplete() else FAILED
+
+def _solve_backtracking(s: Sudoku, control: SolveControl, stats: dict, **opts) -> str:
+    import Backtracking
+    ops = Backtracking.operations
+    try:
+        ok = Backtracking.algorithm(s, control)
+    finally:
+        stats["operations"] = Backtracking.operations - ops
+        stats["isValidRuns"] = s.isValidRuns
+    return SOLVED if ok and s.isComplete() else UNSAT
+
+class SolverRegistry:
+    '''
+    Solver name -> adapter. An entry may be registered as a "module:function" string, which
+    is imported and replaced by the function the first time the solver is requested.
+    '''
+    def __init__(self, entries: dict | None = None):
+        self._entries = dict(entries or {})
+
+    def register(self, name: str, adapter) -> None:
+        self._entries[name] = adapter
+
+    def get(self, name: str):
+        if name not in self._entries:
+            raise ValueError(f"Unknown solver '{name}'")
+        adapter = self._entries[name]
+        if isinstance(adapter, str):
+            module, _, attr = adapter.partition(":")
+            adapter = getattr(importlib.import_module(module), attr)
+            self._entries[name] = adapter
+        return adapter
+
+    def is_loaded(self, name: str) -> bool:
+        return not isinstance(self._entries.get(name, ""), str)
+
+    def __contains__(self, name) -> bool:
+        return name in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# The built-in adapters import their engine inside the call; string entries import on first use
+SOLVERS = SolverRegistry({
+    "algx": _solve_algx,
+    "dsatur": _solve_dsatur,
+    "simanneal": _solve_simanneal,
+    "backtracking": _solve_backtracking,
+    "lockstep": "batch_propagate:_solve_lockstep", # needs NumPy
+    "algx_jit": "kernels:_solve_algx_jit",         # compiled with Numba when installed
+    "simanneal_jit": "kernels:_solve_simanneal_jit",
+})
+
+def register_solver(name: str, adapter, check_every: int | None = None) -> None:
+    '''Adds a solver: an adapter function or a lazy "module:function" path.'''
+    SOLVERS.register(name, adapter)
+    if check_every is not None:
+        CHECK_EVERY[name] = check_every
+
+def solve(s: Sudoku, solver: str = "algx", timeout: float | None = None, deadline: float | None = None,
+          token: CancelToken | None = None, check_every: int | None = None, checkpoint=None,
+          checkpoint_interval: float = 60.0, resume: dict | None = None, **opts) -> SolveResult:
+    '''
+    Solves `s` in place with the named solver. `timeout` is relative seconds, `deadline` an
+    absolute time.monotonic() value (the earlier of the two wins). Extra keyword options are
+    passed to the solver adapter (e.g. max_steps for dsatur, max_iters for simanneal).
+
+    Resumable solvers (algx, simanneal) call checkpoint(state) every checkpoint_interval
+    seconds and return the state in result.resume when interrupted; solve(s, solver,
+    resume=state) on the same starting puzzle continues from there.
+    '''
+    adapter = SOLVERS.get(solver)
+    start = time.monotonic()
+    if timeout is not None:
+        deadline = start + timeout if deadline is None else min(deadline, start + timeout)
+    if check_every is None:
+        check_every = CHECK_EVERY.get(solver, DEFAULT_CHECK_EVERY)
+    control = SolveControl(deadline, token, check_every, checkpoint, checkpoint_interval)
+    stats: dict = {}
+    if resume is not None:
+        if resume.get("solver") != solver:
+            raise ValueError(f"Checkpoint is for '{resume.get('solver')}', not '{solver}'")
+        opts["resume"] = resume
+        stats["resumed"] = True
+    state = None
+    try:
+        control.check()
+        status = adapter(s, control, stats, **opts)
+    except SolveInterrupted as e:
+        status = e.status
+        if control.snapshot is not None:
+            state = control.snapshot()
+    stats["ticks"] = control.ticks
+    return SolveResult(status, time.monotonic() - start, stats, state)
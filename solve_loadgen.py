@@ -0,0 +1,114 @@
+'''
+Load generator for solve_server.py.
+
+    python solve_loadgen.py --tcp 127.0.0.1:8765 --file size3.csv --requests 5000 --connections 4 --pipeline 64
+
+Opens several connections, keeps up to --pipeline requests outstanding on each,
+and reports throughput, client-side latency percentiles, status counts and the
+server's own stats at the end.
+'''
+
+import argparse, asyncio, csv, itertools, json, sys, time
+from bench_results import percentile
+
+def read_puzzle_strings(path: str, limit: int | None = None) -> list[str]:
+    with open(path, newline='') as f:
+        rows = (row["puzzle"].strip() for row in csv.DictReader(f))
+        return list(itertools.islice(rows, limit))
+
+async def _connect(tcp: str | None, unix: str | None):
+    if unix:
+        return await asyncio.open_unix_connection(unix)
+    host, port = tcp.rsplit(":", 1)
+    return await asyncio.open_connection(host, int(port))
+
+async def _connection(tcp, unix, work, pipeline: int, solver: str, timeout, latencies: list, statuses: dict):
+    reader, writer = await _connect(tcp, unix)
+    window = asyncio.Semaphore(pipeline)
+    sent: dict[int, float] = {}
+    done = asyncio.Event()
+    remaining = {"n": 0, "closed": False}
+
+    async def receive():
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            resp = json.loads(line)
+            t0 = sent.pop(resp.get("id"), None)
+            if t0 is not None:
+                latencies.append(time.monotonic() - t0)
+            statuses[resp.get("status")] = statuses.get(resp.get("status"), 0) + 1
+            window.release()
+            remaining["n"] -= 1
+            if remaining["closed"] and remaining["n"] == 0:
+                break
+        done.set()
+
+    receiver = asyncio.get_running_loop().create_task(receive())
+    for req_id, puzzle in work:
+        await window.acquire()
+        req = {"id": req_id, "puzzle": puzzle, "solver": solver}
+        if timeout is not None:
+            req["timeout"] = timeout
+        sent[req_id] = time.monotonic()
+        remaining["n"] += 1
+        writer.write((json.dumps(req) + "\n").encode())
+        await writer.drain()
+    remaining["closed"] = True
+    if remaining["n"] > 0:
+        await done.wait()
+    receiver.cancel()
+    writer.close()
+
+async def _server_stats(tcp, unix) -> dict:
+    reader, writer = await _connect(tcp, unix)
+    writer.write(b'{"op": "stats"}\n')
+    await writer.drain()
+    stats = json.loads(await reader.readline())["stats"]
+    writer.close()
+    return stats
+
+async def run(tcp, unix, puzzles: list[str], requests: int, connections: int, pipeline: int,
+              solver: str, timeout) -> dict:
+    jobs = iter((i, puzzles[i % len(puzzles)]) for i in range(requests))
+    latencies: list[float] = []
+    statuses: dict = {}
+    start = time.monotonic()
+    await asyncio.gather(*(_connection(tcp, unix, jobs, pipeline, solver, timeout, latencies, statuses)
+                           for _ in range(connections)))
+    elapsed = time.monotonic() - start
+    lat = sorted(latencies)
+    return {
+        "requests": len(lat),
+        "seconds": elapsed,
+        "throughput": len(lat) / elapsed if elapsed > 0 else 0.0,
+        "latency_p50": percentile(lat, 50),
+        "latency_p95": percentile(lat, 95),
+        "latency_p99": percentile(lat, 99),
+        "statuses": statuses,
+        "server": await _server_stats(tcp, unix),
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load generator for solve_server.py.")
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument("--tcp", default="127.0.0.1:8765")
+    where.add_argument("--unix")
+    parser.add_argument("--file", default="size3.csv", help="CSV with a 'puzzle' column")
+    parser.add_argument("--limit", type=int, help="distinct puzzles to read from the file")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--pipeline", type=int, default=32, help="outstanding requests per connection")
+    parser.add_argument("--solver", default="algx")
+    parser.add_argument("--timeout", type=float)
+    args = parser.parse_args(argv)
+
+    puzzles = read_puzzle_strings(args.file, args.limit)
+    report = asyncio.run(run(None if args.unix else args.tcp, args.unix, puzzles, args.requests,
+                             args.connections, args.pipeline, args.solver, args.timeout))
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
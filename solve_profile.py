@@ -0,0 +1,141 @@
+'''
+Profile capture for single slow solves (Dataloader_II --profile-dir).
+
+The solve is re-run under cProfile while a sampler records the solving thread's stack
+every `interval` seconds of CPU time (see StackSampler). Each capture writes two files:
+
+    {solver}-size{n}-{index}.prof        cProfile stats (python -m pstats, snakeviz)
+    {solver}-size{n}-{index}.collapsed   "frame;frame;frame count" lines (flamegraph.pl, speedscope)
+
+cProfile slows pure-Python solvers down a few times, so a rerun under a timeout covers
+less work than the original solve. The sampler only sees Python frames: NumPy calls
+and compiled kernels (kernels.py) show up as their Python caller.
+
+    profiler = OutlierProfiler("profiles", percentile=99)
+    if profiler.is_outlier("algx", 3, elapsed):
+        profiler.capture("algx", puzzle, index)
+'''
+
+import bisect, cProfile, os, signal, sys, threading
+from Sudoku import Sudoku
+from bench_results import percentile
+import solve_api
+
+class StackSampler:
+    '''
+    Counts collapsed stacks of the thread that starts it. With a root code object, stacks
+    start at that function and samples taken outside it are dropped.
+
+    On the main thread of a Unix process a SIGPROF timer (CPU time, rounded up to the
+    kernel tick) interrupts the solver itself, so samples land on whatever Python line is
+    running. Elsewhere a helper thread
+    reads the stack; it can only do so when it gets the GIL, which the solver mostly hands
+    over inside GIL-releasing C calls (NumPy sorts), so those are over-counted.
+    '''
+    def __init__(self, interval: float = 0.001, root=None):
+        self.interval = interval
+        self.root = root
+        self.counts: dict[str, int] = {}
+        self.thread_id = None
+        self._signal = False
+        self._old_handler = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._switch = None
+
+    def _add(self, frame) -> None:
+        stack = []
+        code = None
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = None if code is self.root else frame.f_back
+        if stack and (self.root is None or code is self.root):
+            key = ";".join(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _on_signal(self, signum, frame):
+        self._add(frame)
+
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            self._add(sys._current_frames().get(self.thread_id))
+
+    def start(self):
+        self.thread_id = threading.get_ident()
+        self._signal = hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+        if self._signal:
+            self._old_handler = signal.signal(signal.SIGPROF, self._on_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            # by default the solver only has to hand the GIL over every 5ms
+            self._switch = sys.getswitchinterval()
+            sys.setswitchinterval(min(self._switch, self.interval))
+            self._thread = threading.Thread(target=self._poll, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._signal:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self._old_handler)
+        else:
+            self._stop.set()
+            self._thread.join()
+            sys.setswitchinterval(self._switch)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+def profile_solve(s: Sudoku, solver: str, base: str, timeout: float | None = None,
+                  interval: float = 0.001, **opts) -> solve_api.SolveResult:
+    '''Solves `s` in place under cProfile and the sampler; writes base.prof and base.collapsed.'''
+    profile = cProfile.Profile()
+    with StackSampler(interval, root=solve_api.solve.__code__) as sampler:
+        profile.enable()
+        try:
+            res = solve_api.solve(s, solver, timeout=timeout, **opts)
+        finally:
+            profile.disable()
+    profile.dump_stats(base + ".prof")
+    sampler.write_collapsed(base + ".collapsed")
+    return res
+
+class OutlierProfiler:
+    '''
+    Keeps the solve times seen so far per (solver, size) and captures a profile of any
+    solve slower than the given percentile of them. Nothing counts as an outlier until
+    min_solves times are in, so the first solves of a run are never captured.
+    '''
+    def __init__(self, directory: str, percentile: float = 99.0, min_solves: int = 50,
+                 timeout: float | None = None, interval: float = 0.001):
+        self.directory = directory
+        self.percentile = percentile
+        self.min_solves = min_solves
+        self.timeout = timeout
+        self.interval = interval
+        self.times: dict[tuple[str, int], list[float]] = {}
+        self.captured = 0
+
+    def is_outlier(self, solver: str, size: int, elapsed: float) -> bool:
+        times = self.times.setdefault((solver, size), [])
+        bisect.insort(times, elapsed)
+        return len(times) >= self.min_solves and elapsed > percentile(times, self.percentile)
+
+    def capture(self, solver: str, puzzle: Sudoku, index: int, **opts) -> str:
+        '''Re-runs a copy of puzzle; returns the path of the files without extension.'''
+        base = os.path.join(self.directory, f"{solver}-size{puzzle.size}-{index}")
+        s = Sudoku(puzzle.size)
+        s.board = [row[:] for row in puzzle.board]
+        s.fixed = [row[:] for row in puzzle.fixed]
+        profile_solve(s, solver, base, self.timeout, self.interval, **opts)
+        self.captured += 1
+        return base
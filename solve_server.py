@@ -0,0 +1,269 @@
+'''
+Asyncio solving service: JSON lines over TCP or a Unix socket.
+
+    python solve_server.py --tcp 127.0.0.1:8765 --workers 4
+    python solve_server.py --unix /tmp/sudoku.sock
+
+Request (one JSON object per line):
+    {"id": 1, "puzzle": "0103301000002001", "solver": "algx", "timeout": 2.0}
+"size" is optional (inferred from the cell count); "puzzle" is in character or token
+form (see board_codec). "timeout" (seconds) defaults to --default-timeout and is capped at
+--max-timeout, so no request holds a worker, and the batch it was grouped with, unbounded.
+Response:
+    {"id": 1, "status": "solved", "solution": "...", "elapsed": ..., "latency": ...,
+     "queue_wait": ..., "batch": 8}
+{"op": "stats"} returns queue depth, in-flight batches, counters and latency percentiles.
+
+Requests go through one bounded queue. When it is full, connections stop being read
+until there is room (backpressure), or with --reject-when-full get {"status": "busy"}.
+Small boards (up to --batch-max-length, default 9x9) are grouped into batches of up to
+--batch requests, waiting at most --linger-ms, so one process-pool dispatch covers many
+puzzles; larger boards are dispatched alone.
+'''
+
+import argparse, asyncio, json, os, sys, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import board_codec
+from bench_results import percentile
+
+BUSY = "busy"
+ERROR = "error"
+
+def _solve_batch(jobs: list[tuple[int, list[int], str, float | None]]) -> list[tuple[str, str, float, dict]]:
+    '''Worker side: solves (size, values, solver, timeout) jobs; returns (status, solution, elapsed, stats).'''
+    from Sudoku import Sudoku
+    import solve_api
+    out = []
+    for size, values, solver, timeout in jobs:
+        s = Sudoku(size)
+        N = s.length
+        for i, v in enumerate(values):
+            s.board[i // N][i % N] = v
+            s.fixed[i // N][i % N] = v != 0
+        try:
+            res = solve_api.solve(s, solver, timeout=timeout)
+        except Exception as e:
+            out.append((ERROR, "", 0.0, {"error": str(e)}))
+            continue
+        solution = board_codec.format_values([v for row in s.board for v in row], N) if res.solved else ""
+        out.append((res.status, solution, res.elapsed, res.stats))
+    return out
+
+def parse_request(req: dict, default_timeout: float | None = None,
+                  max_timeout: float | None = None) -> tuple[int, list[int], str, float | None]:
+    text = str(req["puzzle"]).strip()
+    size = req.get("size")
+    size = board_codec.infer_size(text) if size is None else int(size)
+    values = board_codec.parse_values(text, size * size)
+    timeout = req.get("timeout")
+    timeout = default_timeout if timeout is None else float(timeout)
+    if max_timeout is not None:
+        timeout = max_timeout if timeout is None else min(timeout, max_timeout)
+    return size, values, req.get("solver", "algx"), timeout
+
+class Metrics:
+    def __init__(self, window: int = 10000):
+        self.received = 0
+        self.completed = 0
+        self.rejected = 0
+        self.errors = 0
+        self.batches = 0
+        self.latencies = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+
+    def snapshot(self, queue_depth: int, in_flight: int) -> dict:
+        lat = sorted(self.latencies)
+        return {
+            "queue_depth": queue_depth,
+            "in_flight_batches": in_flight,
+            "received": self.received,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "batches": self.batches,
+            "mean_batch": sum(self.batch_sizes) / len(self.batch_sizes) if self.batch_sizes else 0.0,
+            "latency_p50": percentile(lat, 50) if lat else None,
+            "latency_p95": percentile(lat, 95) if lat else None,
+            "latency_p99": percentile(lat, 99) if lat else None,
+        }
+
+class Pending:
+    __slots__ = ("job", "future", "received")
+    def __init__(self, job, future, received):
+        self.job = job
+        self.future = future
+        self.received = received
+
+class SolveServer:
+    def __init__(self, workers: int | None = None, queue_size: int = 1024, batch: int = 32,
+                 linger_ms: float = 2.0, batch_max_length: int = 9, reject_when_full: bool = False,
+                 default_timeout: float | None = 10.0, max_timeout: float | None = 60.0):
+        workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(workers)
+        self.max_in_flight = 2 * workers
+        self.queue: asyncio.Queue | None = None
+        self.queue_size = queue_size
+        self.batch = batch
+        self.linger = linger_ms / 1000.0
+        self.batch_max_length = batch_max_length
+        self.reject_when_full = reject_when_full
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+        self.metrics = Metrics()
+        self.in_flight = 0
+        self._slots: asyncio.Semaphore | None = None
+        self._carry: Pending | None = None
+
+    def stats(self) -> dict:
+        return self.metrics.snapshot(self.queue.qsize(), self.in_flight)
+
+    async def _next_batch(self) -> list[Pending]:
+        if self._carry is not None:
+            first, self._carry = self._carry, None
+        else:
+            first = await self.queue.get()
+        batch = [first]
+        if first.job[0] ** 2 > self.batch_max_length:
+            return batch
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch:
+            try:
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item.job[0] ** 2 > self.batch_max_length: # large board: it goes out alone next
+                self._carry = item
+                break
+            batch.append(item)
+        return batch
+
+    async def _run(self, batch: list[Pending]) -> None:
+        self.in_flight += 1
+        self.metrics.batches += 1
+        self.metrics.batch_sizes.append(len(batch))
+        dispatched = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self.pool, _solve_batch, [p.job for p in batch])
+        except Exception as e:
+            results = [(ERROR, "", 0.0, {"error": str(e)})] * len(batch)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+        for p, (status, solution, elapsed, stats) in zip(batch, results):
+            if not p.future.done():
+                p.future.set_result((status, solution, elapsed, stats, dispatched - p.received, len(batch)))
+
+    async def dispatcher(self) -> None:
+        # Only pull work off the queue when a pool slot is free, so a busy pool lets the
+        # queue fill up and the connections feel the backpressure.
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = await self._next_batch()
+            loop.create_task(self._run(batch))
+
+    async def _answer(self, req_id, pending: Pending, writer: asyncio.StreamWriter) -> None:
+        status, solution, elapsed, stats, wait, batch = await pending.future
+        latency = time.monotonic() - pending.received
+        self.metrics.completed += 1
+        if status == ERROR:
+            self.metrics.errors += 1
+        self.metrics.latencies.append(latency)
+        resp = {"id": req_id, "status": status, "solution": solution, "elapsed": elapsed,
+                "latency": latency, "queue_wait": wait, "batch": batch, "stats": stats}
+        writer.write((json.dumps(resp) + "\n").encode())
+        await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                received = time.monotonic()
+                req = None
+                try:
+                    req = json.loads(line)
+                    if req.get("op") == "stats":
+                        writer.write((json.dumps({"id": req.get("id"), "stats": self.stats()}) + "\n").encode())
+                        await writer.drain()
+                        continue
+                    job = parse_request(req, self.default_timeout, self.max_timeout)
+                except Exception as e:
+                    self.metrics.errors += 1
+                    # echo the id whenever the line was a JSON object, so pipelined clients know which one failed
+                    req_id = req.get("id") if isinstance(req, dict) else None
+                    writer.write((json.dumps({"id": req_id, "status": ERROR, "error": str(e)}) + "\n").encode())
+                    await writer.drain()
+                    continue
+                self.metrics.received += 1
+                pending = Pending(job, loop.create_future(), received)
+                if self.reject_when_full and self.queue.full():
+                    self.metrics.rejected += 1
+                    writer.write((json.dumps({"id": req.get("id"), "status": BUSY}) + "\n").encode())
+                    await writer.drain()
+                    continue
+                await self.queue.put(pending) # blocks reading this connection while the queue is full
+                task = loop.create_task(self._answer(req.get("id"), pending, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve(self, tcp: str | None = None, unix: str | None = None) -> None:
+        self.queue = asyncio.Queue(self.queue_size)
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        if unix:
+            server = await asyncio.start_unix_server(self.handle, path=unix)
+        else:
+            host, port = (tcp or "127.0.0.1:8765").rsplit(":", 1)
+            server = await asyncio.start_server(self.handle, host, int(port))
+        dispatcher = asyncio.get_running_loop().create_task(self.dispatcher())
+        addrs = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"Serving on {addrs}", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            dispatcher.cancel()
+            self.pool.shutdown(cancel_futures=True)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="JSON-lines Sudoku solving server.")
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument("--tcp", default="127.0.0.1:8765", help="host:port (default 127.0.0.1:8765)")
+    where.add_argument("--unix", help="Unix socket path")
+    parser.add_argument("--workers", type=int, help="solver processes (default: CPU count)")
+    parser.add_argument("--queue", type=int, default=1024, help="max queued requests before backpressure")
+    parser.add_argument("--batch", type=int, default=32, help="max small puzzles per dispatch")
+    parser.add_argument("--linger-ms", type=float, default=2.0, help="max wait to fill a batch")
+    parser.add_argument("--batch-max-length", type=int, default=9, help="largest board side that is batched")
+    parser.add_argument("--reject-when-full", action="store_true", help="answer 'busy' instead of blocking")
+    parser.add_argument("--default-timeout", type=float, default=10.0,
+                        help="seconds per solve for requests without a timeout (default 10)")
+    parser.add_argument("--max-timeout", type=float, default=60.0,
+                        help="cap on any request's timeout in seconds (default 60)")
+    args = parser.parse_args(argv)
+
+    server = SolveServer(args.workers, args.queue, args.batch, args.linger_ms,
+                         args.batch_max_length, args.reject_when_full, args.default_timeout, args.max_timeout)
+    try:
+        asyncio.run(server.serve(None if args.unix else args.tcp, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+'''
+Single command-line entry point (installed as `sudoku`, see pyproject.toml).
+
+    sudoku solve 0103301000002001 --solver algx
+    sudoku solve --file size4.csv --index 7 --solver auto --timeout 5
+    sudoku bench --files size3.csv --solvers algx      (Dataloader_II)
+    sudoku generate --size 4 --count 1000              (heterogeneous_generator)
+    sudoku serve --tcp 127.0.0.1:8765                  (solve_server)
+    sudoku startup --budget-ms 150
+
+Subcommand modules are imported only when their command runs, so starting the CLI
+costs an interpreter plus this file; `startup` measures that cold start and fails
+when it goes over budget or pulls in heavy modules.
+'''
+
+import sys
+
+COMMANDS = {
+    "solve": "sudoku_cli:solve_main",
+    "bench": "Dataloader_II:main",
+    "generate": "heterogeneous_generator:main",
+    "serve": "solve_server:main",
+    "startup": "sudoku_cli:startup_main",
+}
+# Modules that a plain `sudoku solve` must not import
+HEAVY_MODULES = ("numpy", "tqdm", "asyncio", "multiprocessing")
+STARTUP_PUZZLE = "0103301000002001"
+
+def _read_puzzle(path: str, index: int) -> str:
+    import csv
+    with open(path, newline='') as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            if i == index:
+                return row["puzzle"].strip()
+    raise IndexError(f"{path} has no puzzle {index}")
+
+def solve_main(argv=None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(prog="sudoku solve", description="Solve one puzzle.")
+    parser.add_argument("puzzle", nargs="?", help="character or token form (see board_codec)")
+    parser.add_argument("--file", help="read the puzzle from a sizeN.csv file instead")
+    parser.add_argument("--index", type=int, default=0, help="row of --file (default 0)")
+    parser.add_argument("--size", type=int, help="box size (default: inferred from the cell count)")
+    parser.add_argument("--solver", default="algx", help="solver name, or 'auto' for the portfolio")
+    parser.add_argument("--timeout", type=float)
+    parser.add_argument("--grid", action="store_true", help="print the board as a grid")
+    args = parser.parse_args(argv)
+    if (args.puzzle is None) == (args.file is None):
+        parser.error("give either a puzzle or --file")
+
+    import board_codec
+    from Sudoku import Sudoku
+    text = _read_puzzle(args.file, args.index) if args.file else args.puzzle
+    size = args.size or board_codec.infer_size(text)
+    s = Sudoku(size)
+    s.fillFromString(text)
+    if args.solver == "auto":
+        import portfolio
+        res = portfolio.solve_auto(s, timeout=args.timeout)
+    else:
+        import solve_api
+        res = solve_api.solve(s, args.solver, timeout=args.timeout)
+    print(f"{res.status} in {res.elapsed:.4f}s")
+    if res.solved:
+        print(s.toString() if args.grid else board_codec.format_values([v for row in s.board for v in row], s.length))
+    return 0 if res.solved else 1
+
+def startup_main(argv=None) -> int:
+    import argparse, os, statistics, subprocess, time
+    parser = argparse.ArgumentParser(prog="sudoku startup",
+                                     description="Measure the CLI cold start (`sudoku solve` on a 4x4 board).")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="fail if the median is above this")
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list")
+    args = parser.parse_args(argv)
+
+    cmd = [sys.executable, os.path.abspath(__file__), "solve", STARTUP_PUZZLE]
+    times = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    base = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        base.append((time.perf_counter() - start) * 1000)
+
+    # one more run with -X importtime: "import time: self | cumulative | module"
+    out = subprocess.run([sys.executable, "-X", "importtime"] + cmd[1:], check=True,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True).stderr
+    imports = []
+    for line in out.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            imports.append((int(parts[1]), parts[2].rstrip()))
+    loaded = {name.strip() for _, name in imports}
+    heavy = [m for m in HEAVY_MODULES if m in loaded]
+
+    median = statistics.median(times)
+    print(f"cold start: median {median:.1f}ms, min {min(times):.1f}ms over {args.runs} runs "
+          f"(bare interpreter {statistics.median(base):.1f}ms), budget {args.budget_ms:.0f}ms")
+    print("slowest imports (cumulative us):")
+    for us, name in sorted(imports, reverse=True)[:args.top]:
+        print(f"  {us:>8} {name}")
+    ok = median <= args.budget_ms and not heavy
+    if heavy:
+        print("heavy modules imported: " + ", ".join(heavy))
+    print("OK" if ok else "OVER BUDGET")
+    return 0 if ok else 1
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in COMMANDS:
+        print(__doc__.strip(), file=sys.stderr)
+        return 0 if argv and argv[0] in ("-h", "--help") else 2
+    module, _, func = COMMANDS[argv[0]].partition(":")
+    if module == "sudoku_cli":
+        target = globals()[func]
+    else:
+        import importlib
+        target = getattr(importlib.import_module(module), func)
+    return target(argv[1:]) or 0
+
+if __name__ == "__main__":
+    sys.exit(main())